@@ -1,6 +1,6 @@
 from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadSignature
 from django.conf import settings
-from django.core.mail import send_mail
+from .models import OutboxEmail
 
 
 def encode_verification(user_id, salt):
@@ -29,6 +29,20 @@ def decode_verification(verification_string, salt, ttl=86400):
         return None
 
 
+def queue_email(subject, body, recipients):
+    """
+        queue an email in the outbox, it's sent by the 'send_outbox' manage command
+        call it in the transaction of the request (the views queue it in a transaction.atomic block),
+        so the email is only sent if the request's changes are committed
+    """
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=settings.AUTH_EMAIL_FROM_ADDRESS,
+        recipients=recipients,
+    )
+
+
 VERIFY_EMAIL_SUBJECT = 'verify your email address'
 
 VERIFY_EMAIL_BODY = '''
@@ -38,12 +52,10 @@ In production, this should link to page that can handle the POST of this value.
 '''
 
 def send_verify_email(email_address, verification_string):
-    return send_mail(
+    return queue_email(
         VERIFY_EMAIL_SUBJECT,
         VERIFY_EMAIL_BODY.format(verification_string=verification_string),
-        settings.AUTH_EMAIL_FROM_ADDRESS,
         [email_address],
-        fail_silently=False,
     )
 
 
@@ -56,12 +68,10 @@ In production, this should link to page that can handle the password reset.
 '''
 
 def send_reset_email(email_address, verification_string):
-    return send_mail(
+    return queue_email(
         RESET_EMAIL_SUBJECT,
         RESET_EMAIL_BODY.format(verification_string=verification_string),
-        settings.AUTH_EMAIL_FROM_ADDRESS,
         [email_address],
-        fail_silently=False,
     )
 
 
@@ -0,0 +1,111 @@
+import logging
+import random
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils.timezone import now
+from account.models import OutboxEmail
+
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts):
+    # the delay doubles w/ each attempt, w/ jitter so failed batches don't retry together
+    delay = min(settings.OUTBOX_RETRY_MAX_DELAY, settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.9, 1.1))
+
+
+def failed(email, error):
+    email.attempts += 1
+    email.last_error = str(error)
+    email.next_attempt = now() + retry_delay(email.attempts)
+    if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        # the email is no longer selected to send, it's left in the outbox w/ its last error
+        logger.error(
+            'abandoned email %s to %s after %d attempts : %s',
+            email.id, ', '.join(email.recipients), email.attempts, error,
+        )
+
+
+def send_batch(batch_size):
+    """
+        send a batch of due email over one smtp connection, return the number attempted
+
+        rows are locked w/ SKIP LOCKED, so several senders can run at once and
+        never send the same email, the locks are held until the batch is recorded
+    """
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects
+                .select_for_update(skip_locked=True)
+                .filter(
+                    sent__isnull=True,
+                    next_attempt__lte=now(),
+                    attempts__lt=settings.OUTBOX_MAX_ATTEMPTS,
+                )
+                .order_by('next_attempt')[:batch_size]
+        )
+        if not emails:
+            return 0
+        mail_connection = get_connection()
+        try:
+            mail_connection.open()
+        except Exception as error:
+            logger.warning('unable to connect to send %d emails : %s', len(emails), error)
+            for email in emails:
+                failed(email, error)
+        else:
+            try:
+                for email in emails:
+                    message = EmailMessage(
+                        email.subject,
+                        email.body,
+                        email.from_email,
+                        email.recipients,
+                        connection=mail_connection,
+                    )
+                    try:
+                        message.send()
+                        email.sent = now()
+                    except Exception as error:
+                        logger.warning('unable to send email %s : %s', email.id, error)
+                        failed(email, error)
+            finally:
+                mail_connection.close()
+        OutboxEmail.objects.bulk_update(
+            emails, ['sent', 'attempts', 'last_error', 'next_attempt']
+        )
+    return len(emails)
+
+
+class Command(BaseCommand):
+    """
+        send the email queued in the outbox
+
+        runs until stopped, polling every OUTBOX_POLL_INTERVAL seconds when the
+        outbox is empty, use --once to send the due email and exit
+    """
+
+    help = 'send email queued in the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='exit when no email is due')
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or settings.OUTBOX_BATCH_SIZE
+        while True:
+            # a full batch means more email is likely due, so it's sent w/o waiting
+            attempted = send_batch(batch_size)
+            if attempted and options['verbosity'] > 1:
+                self.stdout.write(f'attempted {attempted} emails')
+            if attempted < batch_size:
+                if options['once']:
+                    return
+                # the connection isn't needed while waiting
+                connection.close()
+                time.sleep(settings.OUTBOX_POLL_INTERVAL)
@@ -0,0 +1,37 @@
+from django.db import models
+from django.utils.timezone import now
+from django.contrib.postgres import fields as postgres
+
+
+class OutboxEmail(models.Model):
+    """
+        email queued by a request, sent by the 'send_outbox' manage command
+
+        an email is written in the transaction of the request that queues it,
+        'sent' is set once it's delivered, failed attempts are retried at
+        'next_attempt' w/ an increasing delay, up to OUTBOX_MAX_ATTEMPTS
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = postgres.ArrayField(models.CharField(max_length=254))
+    created = models.DateTimeField(default=now)
+    next_attempt = models.DateTimeField(default=now)
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    sent = models.DateTimeField(null=True)
+
+    class Meta:
+        indexes = [
+            # unsent email in the order it's due, for the sender
+            models.Index(
+                fields=['next_attempt'],
+                name='account_outbox_unsent_idx',
+                condition=models.Q(sent__isnull=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.id} {self.subject}'
@@ -1,7 +1,9 @@
 from django.conf import settings
 from django.contrib.auth import password_validation
 from rest_framework import serializers
+from users.hashing import set_password
 from users.models import User
+from users.profile import ProfileField
 
 
 class PasswordField(serializers.CharField):
@@ -40,17 +42,17 @@ class SignupSerializer(serializers.Serializer):
 
     email = serializers.EmailField()
     password = PasswordField()
+    profile = ProfileField(required=False)
 
     def validate_email(self, value):
-        if User.objects.filter(email__iexact=value.lower()).exists():
+        if User.objects.with_email(value).exists():
             error_message = f"The email address '{value}' is already in use."
             raise serializers.ValidationError(error_message)
         return value
 
     def create(self, validated_data):
-        user = User.objects.create_user(**validated_data)
-        # todo: handle profile here
-        return user
+        # the profile was cleaned by the field, an omitted profile gets the schema defaults
+        return User.objects.create_user(**validated_data)
 
 
 class ManageSerializer(serializers.ModelSerializer):
@@ -59,10 +61,11 @@ class ManageSerializer(serializers.ModelSerializer):
     """
 
     password = PasswordField(required=False)
+    profile = ProfileField(required=False)
 
     def validate_email(self, value):
         unique_email_excluding_current_user_query = User.objects \
-            .filter(email__iexact=value.lower()) \
+            .with_email(value) \
             .exclude(id=self.instance.id)
         if unique_email_excluding_current_user_query.exists():
             error_message = f"The email address '{value}' is already in use."
@@ -70,22 +73,25 @@ class ManageSerializer(serializers.ModelSerializer):
         return value
 
     def update(self, user, validated_data):
+        # only the changed fields are saved, request.user may be a cached copy
+        update_fields = ['updated_at']
         # update the password
         password = validated_data.pop('password', None)
         if password:
-            user.set_password(password)
+            set_password(user, password)
+            update_fields.append('password')
         # update user fields
         for attr, value in validated_data.items():
             setattr(user, attr, value)
+            update_fields.append(attr)
             # when changing email, reset the verified flag
             if attr == 'email':
                 user.verified = False
+                update_fields.append('verified')
         # save and return
-        user.save()
+        user.save(update_fields=update_fields)
         return user
 
-    # todo: validate profile dict w/ json schema
-
     class Meta:
         model = User
         fields = (
@@ -107,9 +113,6 @@ class ManageSerializer(serializers.ModelSerializer):
             'email': {
                 'required': False,
             },
-            'profile': {
-                'required': False,
-            }
         }
 
 
@@ -1,9 +1,24 @@
 import unittest
 from time import sleep
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import override_settings
 from rest_framework import status
 from rest_framework.test import APITestCase
 from users.models import User
 from .functions import encode_verification, decode_verification
+from .models import OutboxEmail
+
+
+PROFILE_JSON_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'name': {'type': 'string', 'maxLength': 50},
+        'notifications': {'type': 'boolean', 'default': True},
+    },
+    'additionalProperties': False,
+}
 
 
 class SignUpViewTest(APITestCase):
@@ -31,6 +46,23 @@ class SignUpViewTest(APITestCase):
             .post('/account/signup/', self.valid_signup_request, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    @override_settings(PROFILE_JSON_SCHEMA=PROFILE_JSON_SCHEMA)
+    def test_signup_with_profile_merges_defaults(self):
+        signup_request = {**self.valid_signup_request, 'profile': {'name': 'Test User'}}
+        response = self.client \
+            .post('/account/signup/', signup_request, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        test_user = User.objects.get(id=response.json()['user'])
+        self.assertEqual(test_user.profile, {'name': 'Test User', 'notifications': True})
+
+    @override_settings(PROFILE_JSON_SCHEMA=PROFILE_JSON_SCHEMA)
+    def test_signup_error_on_invalid_profile(self):
+        signup_request = {**self.valid_signup_request, 'profile': {'hometown': 'Miami'}}
+        response = self.client \
+            .post('/account/signup/', signup_request, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('profile', response.json())
+
     def test_signup_error_on_existing_user(self):
         existing_user = User.objects.create_user(**self.valid_signup_request)
         response = self.client \
@@ -277,3 +309,48 @@ class ResetView(APITestCase):
         login_sucess = response = self.client \
             .post('/token/login/', self.new_credentials, format='json')
         self.assertEqual(login_sucess.status_code, status.HTTP_200_OK)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        raise ConnectionError('smtp server unavailable')
+
+
+class OutboxTest(APITestCase):
+
+    def setUp(self):
+        self.test_user = User.objects.create_user('test@example.com', 'password1234')
+        self.reset_email_request = { 'email': 'test@example.com' }
+
+    def test_reset_email_is_queued_and_sent(self):
+        response = self.client \
+            .post('/account/reset/', self.reset_email_request, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # the request only queues the email
+        self.assertEqual(len(mail.outbox), 0)
+        call_command('send_outbox', once=True)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['test@example.com'])
+        self.assertIsNotNone(OutboxEmail.objects.get().sent)
+
+    @override_settings(EMAIL_BACKEND='account.tests.FailingEmailBackend')
+    def test_failed_email_is_retried_later(self):
+        response = self.client \
+            .post('/account/reset/', self.reset_email_request, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        call_command('send_outbox', once=True)
+        email = OutboxEmail.objects.get()
+        self.assertIsNone(email.sent)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('smtp server unavailable', email.last_error)
+        # the retry isn't due yet
+        call_command('send_outbox', once=True)
+        self.assertEqual(OutboxEmail.objects.get().attempts, 1)
+
+    @override_settings(EMAIL_BACKEND='account.tests.FailingEmailBackend', OUTBOX_MAX_ATTEMPTS=1)
+    def test_abandoned_email_is_logged(self):
+        self.client.post('/account/reset/', self.reset_email_request, format='json')
+        with self.assertLogs('account.management.commands.send_outbox', 'ERROR') as logs:
+            call_command('send_outbox', once=True)
+        self.assertIn('abandoned email', logs.output[0])
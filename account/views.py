@@ -1,9 +1,12 @@
 from django.conf import settings
+from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST
+from users.hashing import set_password
 from users.models import User
 from tokens.authentication import TokenAuthentication, IsAuthenticated
+from throttling.throttles import ResetIPThrottle, ResetEmailThrottle
 from .serializers import SignupSerializer, ManageSerializer, \
                          ResetEmailSerializer, ResetPasswordSerializer
 from .functions import encode_verification, decode_verification, \
@@ -61,7 +64,8 @@ class VerifyView(APIView):
     def get(self, request, *args, **kwargs):
         # GET request will trigger sending of verification email
         verification_string = encode_verification(request.user.id, 'verify_email')
-        send_verify_email(request.user.email, verification_string)
+        with transaction.atomic():
+            send_verify_email(request.user.email, verification_string)
         return Response({'success': 'verification link sent'}, status=HTTP_200_OK)
 
     def post(self, request, *args, **kwargs):
@@ -70,7 +74,7 @@ class VerifyView(APIView):
             user_id = decode_verification(request.data['verify_code'], 'verify_email')
             if str(request.user.id) == user_id:
                 request.user.verified = True
-                request.user.save()
+                request.user.save(update_fields=['verified', 'updated_at'])
                 success_response = {'success': 'email verified'}
                 return Response(success_response, status=HTTP_200_OK)
         error_message = {'error': 'invalid request'}
@@ -86,10 +90,11 @@ class ResetView(APIView):
 
     authentication_classes = ()
     permission_classes = ()
+    throttle_classes = (ResetIPThrottle, ResetEmailThrottle)
 
     def get_user_by_email(self, email):
         try:
-            return User.objects.get(email__iexact=email.lower(), status=User.STATUS_ACTIVE)
+            return User.objects.with_email(email).get(status=User.STATUS_ACTIVE)
         except User.DoesNotExist:
             pass
 
@@ -104,11 +109,13 @@ class ResetView(APIView):
         if 'email' in request.data:
             serializer = ResetEmailSerializer(data=request.data)
             serializer.is_valid(raise_exception=True)
-            user = self.get_user_by_email(serializer.validated_data['email'])
-            if user:
-                verification_string = encode_verification(user.id, 'reset_password')
-                send_reset_email(user.email, verification_string)
-                return Response({'success': 'reset code sent'}, status=HTTP_200_OK)
+            # only this branch queues email, the password branch hashes outside a transaction
+            with transaction.atomic():
+                user = self.get_user_by_email(serializer.validated_data['email'])
+                if user:
+                    verification_string = encode_verification(user.id, 'reset_password')
+                    send_reset_email(user.email, verification_string)
+                    return Response({'success': 'reset code sent'}, status=HTTP_200_OK)
         # on the second request of the reset flow provide 'verification_code' and 'password'
         elif 'code' in request.data and type(request.data['code']) == str:
             serializer = ResetPasswordSerializer(data=request.data)
@@ -117,7 +124,7 @@ class ResetView(APIView):
             if user_id:
                 user = self.get_user_by_id(user_id)
                 if user:
-                    user.set_password(serializer.validated_data['password'])
+                    set_password(user, serializer.validated_data['password'])
                     user.save()
                     return Response({'success': 'password updated'}, status=HTTP_200_OK)
         # return a general error message response
@@ -0,0 +1,160 @@
+from django.conf import settings
+from django.contrib.postgres.fields import CIEmailField
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db.models import Lookup, TextField
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+from django.utils.timezone import now
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+from users.models import User
+from .serializers import UserFilterSerializer, TokenFilterSerializer
+
+
+def escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class TextILike(Lookup):
+    """
+        ILIKE on a column cast to text, citext has its own ILIKE operator, which
+        the trigram index on email::text can't serve
+    """
+
+    lookup_name = 'text_ilike'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'({lhs})::text ILIKE {rhs}', lhs_params + rhs_params
+
+CIEmailField.register_lookup(TextILike)
+
+
+def search_users(term):
+    """
+        users w/ an email containing the term, most similar first
+
+        the match is an ILIKE on email::text, served by the users_email_trgm_idx
+        trigram index, results are ranked by trigram similarity to the term
+    """
+    return User.objects \
+        .filter(email__text_ilike=f'%{escape_like(term)}%') \
+        .annotate(similarity=TrigramSimilarity(Cast('email', TextField()), term)) \
+        .order_by('-similarity', 'id')
+
+
+class TrigramSearchFilter(BaseFilterBackend):
+    """
+        substring search of user email addresses, for the admin lists
+
+        the list is filtered by the view's 'search_user_field' w/ an IN subquery of the
+        matching users, which reads the trigram index, so token search doesn't join
+        the user table, every match is included
+
+        results of the ADMIN_SEARCH_MAX_USERS users most similar to the search are
+        ranked first, by similarity, results of other matching users follow them
+    """
+
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        if not term:
+            return queryset
+        users = search_users(term)
+        ranked_ids = list(
+            users.values_list('id', flat=True)[:settings.ADMIN_SEARCH_MAX_USERS]
+        )
+        if not ranked_ids:
+            return queryset.none()
+        field = view.search_user_field
+        column = queryset.model._meta.get_field(field).column
+        # users w/o a position in the ranking are null, which sort last
+        rank = RawSQL(
+            f'array_position(%s::uuid[], "{queryset.model._meta.db_table}"."{column}")',
+            [ranked_ids],
+        )
+        ordering = queryset.query.order_by
+        matches = users.order_by().values('id')
+        return queryset.filter(**{f'{field}__in': matches}).order_by(rank, *ordering)
+
+
+class ParameterFilter(BaseFilterBackend):
+    """
+        filter a list by query parameters, validated by 'serializer_class'
+
+        'lookups' maps a parameter to the lookup it filters w/, invalid parameters
+        are a 400 response w/ the errors, as w/ a request body
+    """
+
+    serializer_class = None
+    lookups = {}
+
+    def filter_queryset(self, request, queryset, view):
+        # a plain dict, a missing boolean in form data would be read as false
+        serializer = self.serializer_class(data=request.query_params.dict())
+        serializer.is_valid(raise_exception=True)
+        return self.filter(queryset, serializer.validated_data)
+
+    def filter(self, queryset, parameters):
+        filters = {
+            self.lookups[name]: value
+            for name, value in parameters.items()
+            if name in self.lookups and value is not None
+        }
+        return queryset.filter(**filters)
+
+
+class UserFilter(ParameterFilter):
+    """
+        filters of the admin user list, each served by an index
+
+        status by users_status_join_date_idx, unverified and staff users by partial
+        indexes on join date, join date by users_join_date_id_idx, and last login
+        by users_last_login_idx
+    """
+
+    serializer_class = UserFilterSerializer
+    lookups = {
+        'status': 'status',
+        'verified': 'verified',
+        'is_staff': 'is_staff',
+        'joined_after': 'join_date__gte',
+        'joined_before': 'join_date__lt',
+        'last_login_after': 'last_login__gte',
+        'last_login_before': 'last_login__lt',
+    }
+
+
+class TokenFilter(ParameterFilter):
+    """
+        filters of the admin token list, each served by an index
+
+        user and ip by composite indexes w/ the issue time, issue time by
+        tokens_issued_id_idx, and the states by partial indexes, active tokens
+        (not revoked, renewed, or expired) by expire time, revoked tokens by
+        expire time, renewed tokens by issue time, expired tokens are most of
+        the table and are read in order from tokens_issued_id_idx
+    """
+
+    serializer_class = TokenFilterSerializer
+    lookups = {
+        'user': 'user',
+        'ip': 'ip',
+        'issued_after': 'issued__gte',
+        'issued_before': 'issued__lt',
+    }
+
+    def filter(self, queryset, parameters):
+        queryset = super().filter(queryset, parameters)
+        state = parameters.get('state')
+        if state == 'active':
+            return queryset.filter(revoked__isnull=True, renewed__isnull=True, expires__gt=now())
+        if state == 'revoked':
+            return queryset.filter(revoked__isnull=False)
+        if state == 'renewed':
+            return queryset.filter(renewed__isnull=False)
+        if state == 'expired':
+            return queryset.filter(expires__lte=now())
+        return queryset
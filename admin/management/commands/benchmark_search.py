@@ -0,0 +1,73 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from rest_framework.request import Request
+from admin.views import TokenViewSet, UserViewSet
+
+
+def milliseconds(operation, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        operation()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def trigram_search(view, term):
+    # the first page of the view's list, searched w/ its filter backends
+    request = Request(RequestFactory().get('/', {'search': term}))
+    queryset = view.queryset.all()
+    for backend in view.filter_backends:
+        queryset = backend().filter_queryset(request, queryset, view)
+    return list(queryset[:10])
+
+
+class Command(BaseCommand):
+    """
+        compare the admin user and token search w/ substring scans (email__icontains,
+        as DRF's SearchFilter searched) and the trigram index search in admin.filters
+
+        users, each w/ a token, are seeded in a transaction that is rolled back when the
+        benchmark completes, times are milliseconds to read the first page of results
+    """
+
+    help = 'benchmark admin search over a seeded dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000)
+        parser.add_argument('--iterations', type=int, default=5)
+        parser.add_argument('--terms', nargs='+', default=['user123456', 'r98765@', 'nobody'])
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO users_user
+                        (password, id, email, verified, profile, status, is_staff, join_date, updated_at)
+                    SELECT '', md5(i::text)::uuid, 'user' || i || '@example.com', false, '{}',
+                        'active', false, now(), now()
+                    FROM generate_series(1, %s) AS i
+                """, [options['users']])
+                cursor.execute("""
+                    INSERT INTO tokens_token (id, user_id, issued, expires, refresh)
+                    SELECT md5('token' || id::text)::uuid, id, now(), now(), md5(id::text)
+                    FROM users_user
+                """)
+                cursor.execute('ANALYZE users_user')
+                cursor.execute('ANALYZE tokens_token')
+            self.stdout.write(f"{'search':<20}{'term':<14}{'icontains ms':>14}{'trigram ms':>12}")
+            for term in options['terms']:
+                scans = {
+                    'users': lambda: list(
+                        UserViewSet.queryset.filter(email__icontains=term)[:10]
+                    ),
+                    'tokens': lambda: list(
+                        TokenViewSet.queryset.filter(user__email__icontains=term)[:10]
+                    ),
+                }
+                for name, view in (('users', UserViewSet), ('tokens', TokenViewSet)):
+                    scan = milliseconds(scans[name], iterations)
+                    trigram = milliseconds(lambda: trigram_search(view, term), iterations)
+                    self.stdout.write(f'{name:<20}{term:<14}{scan:>14.1f}{trigram:>12.1f}')
+            transaction.set_rollback(True)
@@ -1,15 +1,163 @@
+import base64
+import binascii
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import LimitOffsetPagination as BaseLimitOffsetPagination
 from rest_framework.response import Response
 
 
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        raise NotFound('Invalid cursor')
+    if not isinstance(values, list):
+        raise NotFound('Invalid cursor')
+    return values
+
+
+def table_estimate(model, using='default'):
+    """
+        the planner's estimate of the rows in a model's table, updated by vacuum and analyze
+        -1 when the table has never been analyzed
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table],
+        )
+        return cursor.fetchone()[0]
+
+
+def query_estimate(queryset):
+    """
+        the planner's estimate of the rows returned by a queryset, from EXPLAIN
+    """
+    sql, params = queryset.order_by().query.get_compiler(queryset.db).as_sql()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    # the plan is json, decoded by psycopg2 or returned as text by some drivers
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
 class LimitOffsetPagination(BaseLimitOffsetPagination):
+    """
+        limit / offset pagination, w/ keyset pagination when a 'cursor' is provided
+
+        'next' in each response is an opaque cursor for the results after the page,
+        requesting it w/ the 'cursor' parameter reads the following page through the
+        index on the view's 'keyset' fields, w/o an OFFSET scan, the count is only
+        included w/ a cursor when 'count=true' is requested, as it scans the table,
+        'count=false' leaves it out of offset pages
+
+        for tables larger than ADMIN_COUNT_ESTIMATE_THRESHOLD the count is the planner's
+        estimate and 'count_estimated' is true, 'count=exact' requests an exact count
+
+        'keyset' is the ordering of the view, two fields in the same direction, the
+        last unique (the primary key), for example ('-issued', '-id')
+    """
 
     default_limit = 10
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = view.keyset
+        # searches are ranked by similarity, those pages are only read by offset
+        self.keyset_ordered = tuple(queryset.query.order_by) == tuple(self.keyset)
+        count = request.query_params.get(self.count_query_param, '').lower()
+        self.exact_count = count == 'exact'
+        self.count_estimated = False
+        self.cursor = request.query_params.get(self.cursor_query_param)
+        self.limit = self.get_limit(request)
+        self.count = None
+        if self.cursor is None:
+            self.offset = self.get_offset(request)
+            if count != 'false':
+                self.count = self.get_count(queryset)
+        else:
+            if not self.keyset_ordered:
+                raise NotFound('Invalid cursor')
+            self.offset = None
+            if count in ('true', 'exact'):
+                self.count = self.get_count(queryset)
+            queryset = queryset.filter(self.after(queryset, decode_cursor(self.cursor)))
+        start = self.offset or 0
+        # one more row than the page tells if there are more results
+        results = list(queryset[start:start + self.limit + 1])
+        self.next_cursor = self.cursor_for(results[self.limit - 1]) \
+            if len(results) > self.limit and self.keyset_ordered else None
+        return results[:self.limit]
+
+    def get_count(self, queryset):
+        if self.exact_count:
+            return super().get_count(queryset)
+        rows = table_estimate(queryset.model, queryset.db)
+        if rows < settings.ADMIN_COUNT_ESTIMATE_THRESHOLD:
+            return super().get_count(queryset)
+        self.count_estimated = True
+        # an unfiltered list has the rows of the table
+        if not queryset.query.where:
+            return rows
+        return query_estimate(queryset)
+
+    def fields(self, model):
+        return [model._meta.get_field(name.lstrip('-')) for name in self.keyset]
+
+    def cursor_for(self, instance):
+        values = []
+        for field in self.fields(type(instance)):
+            value = field.value_from_object(instance)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return encode_cursor(values)
+
+    def after(self, queryset, values):
+        """
+            condition for the rows after the cursor, as a row comparison, which postgres
+            reads as one range of the (field, primary key) index
+        """
+        model = queryset.model
+        fields = self.fields(model)
+        # cursors are encoded as strings, anything else was not made by cursor_for()
+        if len(values) != len(fields) or not all(isinstance(value, str) for value in values):
+            raise NotFound('Invalid cursor')
+        try:
+            values = [field.to_python(value) for field, value in zip(fields, values)]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound('Invalid cursor')
+        if None in values:
+            raise NotFound('Invalid cursor')
+        connection = connections[queryset.db]
+        columns = ', '.join(f'"{model._meta.db_table}"."{field.column}"' for field in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        operator = '<' if self.keyset[0].startswith('-') else '>'
+        return RawSQL(
+            f'({columns}) {operator} ({placeholders})',
+            [field.get_db_prep_value(value, connection) for field, value in zip(fields, values)],
+            output_field=BooleanField(),
+        )
 
     def get_paginated_response(self, results):
-        return Response({
+        response = {
             'limit': self.limit,
             'offset': self.offset,
             'count': self.count,
+            'count_estimated': self.count_estimated,
+            'next': self.next_cursor,
             'results': results,
-        })
+        }
+        if self.count is None:
+            del response['count'], response['count_estimated']
+        return Response(response)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from users.models import User
+from users.profile import ProfileField
 from tokens.models import Token
 
 
@@ -18,9 +19,11 @@ class UserListSerializer(serializers.ModelSerializer):
 
 class UserDetailSerializer(serializers.ModelSerializer):
 
+    profile = ProfileField(required=False)
+
     def validate_email(self, value):
         unique_email_excluding_current_user_query = User.objects \
-            .filter(email__iexact=value.lower()) \
+            .with_email(value) \
             .exclude(id=self.instance.id)
         if unique_email_excluding_current_user_query.exists():
             error_message = f"The email address '{value}' is already in use."
@@ -82,3 +85,35 @@ class TokenDetailSerializer(serializers.ModelSerializer):
             'renewed',
             'source',
         )
+
+
+# dates or datetimes are accepted by the filter parameters
+FILTER_DATETIME_FORMATS = ['iso-8601', '%Y-%m-%d']
+
+
+class UserFilterSerializer(serializers.Serializer):
+    """
+        query parameters filtering the admin user list
+    """
+
+    status = serializers.ChoiceField(choices=User.STATUS_CHOICES, required=False)
+    verified = serializers.BooleanField(required=False, default=None, allow_null=True)
+    is_staff = serializers.BooleanField(required=False, default=None, allow_null=True)
+    joined_after = serializers.DateTimeField(required=False, input_formats=FILTER_DATETIME_FORMATS)
+    joined_before = serializers.DateTimeField(required=False, input_formats=FILTER_DATETIME_FORMATS)
+    last_login_after = serializers.DateTimeField(required=False, input_formats=FILTER_DATETIME_FORMATS)
+    last_login_before = serializers.DateTimeField(required=False, input_formats=FILTER_DATETIME_FORMATS)
+
+
+class TokenFilterSerializer(serializers.Serializer):
+    """
+        query parameters filtering the admin token list
+    """
+
+    STATE_CHOICES = ['active', 'revoked', 'renewed', 'expired']
+
+    user = serializers.UUIDField(required=False)
+    ip = serializers.IPAddressField(required=False)
+    state = serializers.ChoiceField(choices=STATE_CHOICES, required=False)
+    issued_after = serializers.DateTimeField(required=False, input_formats=FILTER_DATETIME_FORMATS)
+    issued_before = serializers.DateTimeField(required=False, input_formats=FILTER_DATETIME_FORMATS)
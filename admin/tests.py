@@ -0,0 +1,202 @@
+import uuid
+from datetime import timedelta
+from django.db import connection
+from django.test import override_settings, RequestFactory
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.test import APITestCase
+from tokens.models import Token
+from users.models import User
+from .filters import search_users, UserFilter, TokenFilter
+from .pagination import LimitOffsetPagination, encode_cursor
+from .views import TokenViewSet, UserViewSet
+
+
+class PaginationTest(APITestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin@example.com', 'password1234')
+        login_response = self.client.post(
+            '/token/login/', {'email': 'admin@example.com', 'password': 'password1234'}, format='json'
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + login_response.json()['token'])
+        # users joined at the same time are ordered by id
+        joined = now() - timedelta(days=1)
+        for i in range(6):
+            User.objects.create(email=f'user{i}@example.com', join_date=joined)
+
+    def read_all(self, url):
+        ids, response = [], self.client.get(url).json()
+        while True:
+            ids += [user['id'] for user in response['results']]
+            if response['next'] is None:
+                return ids
+            response = self.client.get(f"{url}&cursor={response['next']}").json()
+
+    def test_cursor_pages(self):
+        ids = self.read_all('/users/?limit=3')
+        expected = User.objects.order_by('-join_date', '-id').values_list('id', flat=True)
+        self.assertEqual(ids, [str(i) for i in expected])
+
+    def test_count_is_optional_w_cursor(self):
+        first = self.client.get('/users/?limit=2').json()
+        self.assertEqual(first['count'], 7)
+        response = self.client.get(f"/users/?limit=2&cursor={first['next']}").json()
+        self.assertNotIn('count', response)
+        self.assertIsNone(response['offset'])
+        response = self.client.get(f"/users/?limit=2&count=true&cursor={first['next']}").json()
+        self.assertEqual(response['count'], 7)
+
+    def test_cursor_query_uses_index(self):
+        paginator = LimitOffsetPagination()
+        paginator.keyset = TokenViewSet.keyset
+        queryset = TokenViewSet.queryset \
+            .filter(paginator.after(TokenViewSet.queryset, [now().isoformat(), str(uuid.uuid4())]))[:10]
+        # the test table is tiny, the planner is told to avoid a sequential scan
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        self.assertIn('tokens_issued_id_idx', queryset.explain())
+
+    def test_invalid_cursor(self):
+        # an invalid cursor is a 404, as w/ DRF's cursor pagination
+        for values in ('invalid', [1, 'x'], ['2020-01-01T00:00:00Z', 'x'], ['', '']):
+            cursor = values if isinstance(values, str) else encode_cursor(values)
+            with self.subTest(cursor=values):
+                response = self.client.get(f'/users/?cursor={cursor}')
+                self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_count_can_be_skipped_w_offset(self):
+        response = self.client.get('/users/?limit=2&offset=2&count=false').json()
+        self.assertNotIn('count', response)
+        self.assertEqual(len(response['results']), 2)
+
+    def test_estimated_count(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE users_user')
+        with override_settings(ADMIN_COUNT_ESTIMATE_THRESHOLD=0):
+            response = self.client.get('/users/?limit=2').json()
+            self.assertEqual((response['count'], response['count_estimated']), (7, True))
+            # filtered lists are estimated by the planner
+            response = self.client.get('/users/?limit=2&search=user1').json()
+            self.assertTrue(response['count_estimated'])
+            self.assertGreaterEqual(response['count'], 1)
+            response = self.client.get('/users/?limit=2&search=user1&count=exact').json()
+            self.assertEqual((response['count'], response['count_estimated']), (1, False))
+        # small tables are counted
+        response = self.client.get('/users/?limit=2').json()
+        self.assertEqual((response['count'], response['count_estimated']), (7, False))
+
+
+class SearchTest(APITestCase):
+
+    def setUp(self):
+        User.objects.create_superuser('admin@example.com', 'password1234')
+        login_response = self.client.post(
+            '/token/login/', {'email': 'admin@example.com', 'password': 'password1234'}, format='json'
+        )
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + login_response.json()['token'])
+        for email in ('jane.doe@example.com', 'jane@example.com', 'john_doe@example.com'):
+            User.objects.create(email=email)
+
+    def test_users_ranked_by_similarity(self):
+        response = self.client.get('/users/?search=JANE@').json()
+        self.assertEqual([user['email'] for user in response['results']], ['jane@example.com'])
+        response = self.client.get('/users/?search=jane').json()
+        self.assertEqual(
+            [user['email'] for user in response['results']],
+            ['jane@example.com', 'jane.doe@example.com'],
+        )
+        self.assertIsNone(response['next'])
+
+    def test_every_match_is_included(self):
+        # only the most similar user is ranked, the other match is still included
+        with override_settings(ADMIN_SEARCH_MAX_USERS=1):
+            response = self.client.get('/users/?search=jane&count=exact').json()
+        self.assertEqual(
+            [user['email'] for user in response['results']],
+            ['jane@example.com', 'jane.doe@example.com'],
+        )
+        self.assertEqual(response['count'], 2)
+
+    def test_wildcards_are_literal(self):
+        response = self.client.get('/users/?search=n_doe').json()
+        self.assertEqual([user['email'] for user in response['results']], ['john_doe@example.com'])
+
+    def test_tokens_by_user_email(self):
+        response = self.client.get('/tokens/?search=admin').json()
+        self.assertEqual(len(response['results']), 1)
+        response = self.client.get('/tokens/?search=jane').json()
+        self.assertEqual(response['results'], [])
+
+    def test_search_uses_trigram_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        self.assertIn('users_email_trgm_idx', search_users('jane').explain())
+
+
+class FilterTest(APITestCase):
+
+    def setUp(self):
+        User.objects.create_superuser('admin@example.com', 'password1234')
+        login_response = self.client.post(
+            '/token/login/', {'email': 'admin@example.com', 'password': 'password1234'}, format='json'
+        )
+        self.auth = login_response.json()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.auth['token'])
+        User.objects.create(email='old@example.com', status=User.STATUS_LOCKED,
+                            join_date=now() - timedelta(days=30))
+        User.objects.create(email='new@example.com', status=User.STATUS_LOCKED, verified=True)
+
+    def emails(self, query):
+        response = self.client.get(f'/users/?{query}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [user['email'] for user in response.json()['results']]
+
+    def test_user_filters(self):
+        joined = (now() - timedelta(days=7)).date().isoformat()
+        self.assertEqual(self.emails(f'status=locked&joined_after={joined}'), ['new@example.com'])
+        self.assertEqual(self.emails('verified=false&is_staff=true'), ['admin@example.com'])
+        self.assertEqual(self.emails('verified=false&is_staff=false'), ['old@example.com'])
+
+    def test_token_filters(self):
+        tokens = lambda query: self.client.get(f'/tokens/?{query}').json()['results']
+        self.assertEqual(len(tokens('state=active&ip=127.0.0.1')), 1)
+        self.client.post('/token/refresh/', {'refresh': self.auth['refresh']}, format='json')
+        renewed = Token.objects.get(renewed__isnull=False)
+        self.assertEqual([t['id'] for t in tokens('state=renewed')], [str(renewed.id)])
+        self.assertEqual(len(tokens('state=active')), 1)
+        self.assertEqual(tokens('state=revoked'), [])
+
+    def test_invalid_filter(self):
+        response = self.client.get('/users/?status=unknown&joined_after=yesterday')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.json()), {'status', 'joined_after'})
+
+    def plan(self, view, backend, parameters):
+        request = Request(RequestFactory().get('/', parameters))
+        # the test tables are tiny, the planner is told to avoid a sequential scan
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return backend().filter_queryset(request, view.queryset, view).order_by().explain()
+
+    def test_filters_use_indexes(self):
+        plans = [
+            ('users_status_join_date_idx', UserViewSet, UserFilter, {'status': 'locked'}),
+            ('users_unverified_join_date_idx', UserViewSet, UserFilter, {'verified': 'false'}),
+            ('users_staff_join_date_idx', UserViewSet, UserFilter, {'is_staff': 'true'}),
+            ('users_join_date_id_idx', UserViewSet, UserFilter, {'joined_after': '2020-01-01'}),
+            ('users_join_date_id_idx', UserViewSet, UserFilter, {'joined_before': '2020-01-01'}),
+            ('users_last_login_idx', UserViewSet, UserFilter, {'last_login_after': '2020-01-01'}),
+            ('users_last_login_idx', UserViewSet, UserFilter, {'last_login_before': '2020-01-01'}),
+            ('tokens_user_issued_idx', TokenViewSet, TokenFilter, {'user': str(uuid.uuid4())}),
+            ('tokens_ip_issued_idx', TokenViewSet, TokenFilter, {'ip': '127.0.0.1'}),
+            ('tokens_active_expires_idx', TokenViewSet, TokenFilter, {'state': 'active'}),
+            ('tokens_revoked_expires_idx', TokenViewSet, TokenFilter, {'state': 'revoked'}),
+            ('tokens_renewed_issued_idx', TokenViewSet, TokenFilter, {'state': 'renewed'}),
+            ('tokens_issued_id_idx', TokenViewSet, TokenFilter, {'issued_after': '2020-01-01'}),
+            ('tokens_issued_id_idx', TokenViewSet, TokenFilter, {'issued_before': '2020-01-01'}),
+        ]
+        for index, view, backend, parameters in plans:
+            with self.subTest(index=index, parameters=parameters):
+                self.assertIn(index, self.plan(view, backend, parameters))
@@ -1,7 +1,6 @@
 from django.utils.timezone import now
 from rest_framework.response import Response
 from rest_framework.routers import SimpleRouter
-from rest_framework.filters import SearchFilter
 from rest_framework.viewsets import GenericViewSet
 from rest_framework.mixins import (ListModelMixin,
                                    RetrieveModelMixin,
@@ -10,6 +9,7 @@ from rest_framework.mixins import (ListModelMixin,
 from users.models import User
 from tokens.authentication import TokenAuthentication, IsAdminUser
 from tokens.models import Token
+from .filters import TrigramSearchFilter, UserFilter, TokenFilter
 from .pagination import LimitOffsetPagination
 from .serializers import UserListSerializer, UserDetailSerializer, TokenDetailSerializer
 
@@ -26,11 +26,12 @@ class UserViewSet(GenericViewSet, ListModelMixin, RetrieveModelMixin, UpdateMode
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAdminUser,)
 
-    queryset = User.objects.all().order_by('-join_date')
+    queryset = User.objects.all().order_by('-join_date', '-id')
     serializer_class = UserDetailSerializer
     pagination_class = LimitOffsetPagination
-    filter_backends = (SearchFilter,)
-    search_fields = ('email',)
+    keyset = ('-join_date', '-id')
+    filter_backends = (UserFilter, TrigramSearchFilter)
+    search_user_field = 'id'
 
     def list(self, request, *args, **kwargs):
         self.serializer_class = UserListSerializer
@@ -52,11 +53,12 @@ class TokenViewSet(GenericViewSet, ListModelMixin, RetrieveModelMixin, DestroyMo
     authentication_classes = (TokenAuthentication,)
     permission_classes = (IsAdminUser,)
 
-    queryset = Token.objects.all().order_by('-issued')
+    queryset = Token.objects.all().order_by('-issued', '-id')
     serializer_class = TokenDetailSerializer
     pagination_class = LimitOffsetPagination
-    filter_backends = (SearchFilter,)
-    search_fields = ('user__email',)
+    keyset = ('-issued', '-id')
+    filter_backends = (TokenFilter, TrigramSearchFilter)
+    search_user_field = 'user'
 
     def perform_destroy(self, instance):
         # revoke the token
@@ -0,0 +1,8 @@
+from configurations.asgi import get_asgi_application
+from django.conf import settings
+application = get_asgi_application()
+
+# answer /status/ and /token/inspect/ w/o the full django and DRF stack
+if settings.FAST_PATH:
+    from core.fast import FastPathASGI
+    application = FastPathASGI(application)
@@ -0,0 +1,7 @@
+"""
+client components for services consuming tokens issued by the auth service
+
+client.core has the framework agnostic verifier, the adapters are :
+client.authentication (django rest framework), client.middleware (django),
+and client.asgi (any ASGI application), importing this package does not import django
+"""
@@ -0,0 +1,145 @@
+import base64
+import functools
+import jwt
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from jwt.algorithms import Algorithm
+
+
+class Ed25519Algorithm(Algorithm):
+    """
+        EdDSA signing w/ Ed25519 keys, as described by RFC 8037
+        pyjwt 1.x does not include this algorithm, it's registered with pyjwt below
+    """
+
+    def prepare_key(self, key):
+        if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+            return key
+        if isinstance(key, str):
+            key = key.encode()
+        if isinstance(key, bytes):
+            if b'PUBLIC KEY' in key:
+                key = serialization.load_pem_public_key(key, backend=default_backend())
+            else:
+                key = serialization.load_pem_private_key(key, None, backend=default_backend())
+            if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+                return key
+        raise TypeError('expecting an Ed25519 key')
+
+    def sign(self, msg, key):
+        return key.sign(msg)
+
+    def verify(self, msg, key, sig):
+        if isinstance(key, ed25519.Ed25519PrivateKey):
+            key = key.public_key()
+        try:
+            key.verify(sig, msg)
+            return True
+        except InvalidSignature:
+            return False
+
+
+def register_algorithms():
+    # pyjwt 2.x provides EdDSA itself and refuses to register it a second time
+    try:
+        jwt.register_algorithm('EdDSA', Ed25519Algorithm())
+    except ValueError:
+        pass
+
+register_algorithms()
+
+
+# algorithms that can be selected by the type of the key
+ALGORITHMS = ('RS256', 'ES256', 'EdDSA')
+
+
+def algorithm_for_key(key):
+    """
+        return the jwt algorithm used with a private or public key
+
+        the algorithm is always chosen by the key, never by the 'alg' header of
+        a token, which rules out algorithm confusion between key types
+    """
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return 'RS256'
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)):
+        if isinstance(key.curve, ec.SECP256R1):
+            return 'ES256'
+        raise ValueError(f"unsupported elliptic curve '{key.curve.name}', use P-256")
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return 'EdDSA'
+    raise ValueError(f"unsupported key type '{type(key).__name__}'")
+
+
+@functools.lru_cache(maxsize=8)
+def load_public_key(pem):
+    """
+        parse a pem encoded public key, parsed keys are cached by pem string
+        return a tuple of the key and the algorithm used with it
+    """
+    key = serialization.load_pem_public_key(pem.encode(), backend=default_backend())
+    return key, algorithm_for_key(key)
+
+
+def base64url_encode(data):
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def base64url_decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def integer_encode(value):
+    return base64url_encode(value.to_bytes((value.bit_length() + 7) // 8 or 1, 'big'))
+
+
+def integer_decode(data):
+    return int.from_bytes(base64url_decode(data), 'big')
+
+
+def jwk_from_key(public_key, kid):
+    """
+        represent a public key as a json web key (RFC 7517, RFC 8037)
+    """
+    algorithm = algorithm_for_key(public_key)
+    jwk = {'kid': kid, 'alg': algorithm, 'use': 'sig'}
+    if algorithm == 'RS256':
+        numbers = public_key.public_numbers()
+        jwk.update(kty='RSA', n=integer_encode(numbers.n), e=integer_encode(numbers.e))
+    elif algorithm == 'ES256':
+        numbers = public_key.public_numbers()
+        jwk.update(
+            kty='EC',
+            crv='P-256',
+            x=base64url_encode(numbers.x.to_bytes(32, 'big')),
+            y=base64url_encode(numbers.y.to_bytes(32, 'big')),
+        )
+    else:
+        raw = public_key.public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw
+        )
+        jwk.update(kty='OKP', crv='Ed25519', x=base64url_encode(raw))
+    return jwk
+
+
+def key_from_jwk(jwk):
+    """
+        parse a json web key to a public key
+        return a tuple of the key and the algorithm used with it
+    """
+    kty = jwk.get('kty')
+    if kty == 'RSA':
+        numbers = rsa.RSAPublicNumbers(integer_decode(jwk['e']), integer_decode(jwk['n']))
+        key = numbers.public_key(default_backend())
+    elif kty == 'EC' and jwk.get('crv') == 'P-256':
+        numbers = ec.EllipticCurvePublicNumbers(
+            integer_decode(jwk['x']), integer_decode(jwk['y']), ec.SECP256R1()
+        )
+        key = numbers.public_key(default_backend())
+    elif kty == 'OKP' and jwk.get('crv') == 'Ed25519':
+        key = ed25519.Ed25519PublicKey.from_public_bytes(base64url_decode(jwk['x']))
+    else:
+        raise ValueError(f"unsupported json web key type '{kty}'")
+    return key, algorithm_for_key(key)
@@ -0,0 +1,71 @@
+import json
+from . import core
+from .core import AnonymousTokenUser, TokenUser, get_verifier
+
+
+class TokenAuthenticationMiddleware:
+    """
+        ASGI middleware for use with JWT tokens provided by auth-service server
+
+        sets scope['user'] to a TokenUser (or an anonymous user without a token) and
+        scope['auth'] to the token payload, for http and websocket connections,
+        invalid tokens receive a 401 response (or a closed websocket), while the keys
+        of the auth service are unavailable tokens receive a 503 response
+
+        works with any ASGI framework (starlette, django's asgi handler, ...) and
+        does not import django, provide a verifier or call client.core.configure()
+        before the first request when django settings are not available
+    """
+
+    token_prefix_string = 'Token'
+    invalid_token_error_message = 'invalid token'
+    unavailable_error_message = 'authentication is temporarily unavailable'
+    unavailable_retry_after = 5
+
+    def __init__(self, app, verifier=None):
+        self.app = app
+        self.verifier = verifier
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] not in ('http', 'websocket'):
+            return await self.app(scope, receive, send)
+        verifier = self.verifier or get_verifier()
+        header = dict(scope.get('headers', [])).get(b'authorization', b'')
+        try:
+            token = verifier.extract(header, self.token_prefix_string)
+        except core.InvalidToken:
+            return await self.reject(scope, receive, send)
+        payload = None
+        if token:
+            try:
+                payload = await verifier.verify_async(token)
+            except core.KeysUnavailable:
+                return await self.reject(scope, receive, send, unavailable=True)
+            if payload is None:
+                return await self.reject(scope, receive, send)
+        user = TokenUser(payload) if payload else AnonymousTokenUser()
+        scope = dict(scope, user=user, auth=payload)
+        return await self.app(scope, receive, send)
+
+    async def reject(self, scope, receive, send, unavailable=False):
+        if scope['type'] == 'websocket':
+            # closing before the handshake is accepted rejects the connection
+            message = await receive()
+            if message['type'] == 'websocket.connect':
+                # 1013 is 'try again later'
+                await send({'type': 'websocket.close', 'code': 1013 if unavailable else 4401})
+            return
+        message = self.unavailable_error_message if unavailable else self.invalid_token_error_message
+        body = json.dumps({'detail': message}).encode()
+        headers = [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ]
+        if unavailable:
+            headers.append((b'retry-after', str(self.unavailable_retry_after).encode()))
+        await send({
+            'type': 'http.response.start',
+            'status': 503 if unavailable else 401,
+            'headers': headers,
+        })
+        await send({'type': 'http.response.body', 'body': body})
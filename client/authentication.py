@@ -1,39 +1,40 @@
-import jwt
-from django.conf import settings
-from django.utils.timezone import now
 from django.contrib.auth.models import AnonymousUser
 from rest_framework.authentication import BaseAuthentication, get_authorization_header
-from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.exceptions import APIException, AuthenticationFailed
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from . import core
+from .core import get_verifier
 
 
-class TokenUser(AnonymousUser):
+class TokenUser(core.TokenUser, AnonymousUser):
     """
         user model for use w/ JWT token auth
         used in place of the Django database-backed model
         user is populated based on content of the jwt token
     """
 
-    def __init__(self, payload):
-        self.id = payload['user']
-        self.profile = payload['profile']
-        self.payload = payload
 
-    @property
-    def is_authenticated(self):
-        return True
+class AuthenticationUnavailable(APIException):
+    """
+        503 response while the keys of the auth service are unavailable
+    """
 
-    @property
-    def is_anonymous(self):
-        return False
+    status_code = 503
+    default_detail = 'authentication is temporarily unavailable'
+    default_code = 'authentication_unavailable'
 
-    @property
-    def is_active(self):
-        return True
+    def __init__(self, detail=None, code=None, wait=5):
+        super().__init__(detail, code)
+        # read by DRF's exception handler, which sets the Retry-After header
+        self.wait = wait
 
-    @property
-    def is_staff(self):
-        return self.payload['staff'] == True
+
+def get_token_cache():
+    """
+        return the cache of verified token payloads, holding up to AUTH_CLIENT_CACHE_SIZE
+        tokens, the cache is disabled when AUTH_CLIENT_CACHE_SIZE is not configured
+    """
+    return get_verifier().cache
 
 
 class TokenAuthentication(BaseAuthentication):
@@ -54,39 +55,32 @@ class TokenAuthentication(BaseAuthentication):
         if token:
             payload = self.decode_token(token)
             if payload:
-                if not self.token_is_expired(payload):
+                if not self.token_is_expired(payload) and not self.token_is_revoked(payload):
                     user = self.populate_user(payload)
                     return user, payload
             raise AuthenticationFailed(self.authentication_failed_error_message)
 
     def extract_token(self, request):
         # check the auth header for a token, proceed to next auth class if no token
-        auth_header = get_authorization_header(request).split()
-        if not auth_header or auth_header[0].lower() != self.token_prefix_string.lower().encode():
-            return None
-        # fail if header is not in proper '<keyword> <token>' formate
-        if len(auth_header) != 2:
-            raise AuthenticationFailed(self.invalid_token_error_message)
-        # fail if the header contains invalid data
+        # fail if header is not in proper '<keyword> <token>' format or contains invalid data
         try:
-            token = auth_header[1].decode()
-        except UnicodeError:
+            return get_verifier().extract(
+                get_authorization_header(request), self.token_prefix_string
+            )
+        except core.InvalidToken:
             raise AuthenticationFailed(self.invalid_token_error_message)
-        # return the token
-        return token
 
     def decode_token(self, token):
         try:
-            return jwt.decode(token, settings.JWT_PUBLIC_KEY, algorithms=['RS256'])
-            # todo: catch the correct exception types here
-        except Exception:
-            return None
+            return get_verifier().decode(token)
+        except core.KeysUnavailable:
+            raise AuthenticationUnavailable()
 
     def token_is_expired(self, decoded_token):
-        current_timestamp = int(now().strftime('%s'))
-        if decoded_token['expires'] < current_timestamp:
-            return True
-        return False
+        return get_verifier().is_expired(decoded_token)
+
+    def token_is_revoked(self, decoded_token):
+        return get_verifier().is_revoked(decoded_token)
 
     def populate_user(self, decoded_token):
         return TokenUser(decoded_token)
@@ -99,4 +93,7 @@ The TokenUser and TokenAuthentication components are inteded for use in an exter
 For a microservice that would be consuming the auth tokens for identifying users, the database for
 this application would have no user model of it's own. The token would be use to hydrate the
 TokenUser as a replacement for the Django User model.
+
+The verifier in client.core is shared with the Django middleware in client.middleware and the
+ASGI middleware in client.asgi, only these adapter modules import Django or DRF.
 """
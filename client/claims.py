@@ -0,0 +1,61 @@
+import base64
+import uuid
+
+
+# bits of the compact 'flg' claim
+FLAG_STAFF = 1
+
+
+def uuid_encode(value):
+    # a uuid as its 16 bytes, base64url encoded w/o padding (22 characters)
+    return base64.urlsafe_b64encode(uuid.UUID(str(value)).bytes).decode().rstrip('=')
+
+
+def uuid_decode(value):
+    return str(uuid.UUID(bytes=base64.urlsafe_b64decode(value + '==')))
+
+
+def compact_claims(payload, issuer=None, issued=None):
+    """
+        convert access token claims to the compact format
+
+        registered claims replace the long names ('jti', 'sub', 'exp'), uuids are
+        encoded as base64url bytes, and boolean claims are packed into 'flg'
+    """
+    claims = {
+        'jti': uuid_encode(payload['token']),
+        'sub': uuid_encode(payload['user']),
+        'exp': payload['expires'],
+    }
+    if issued is not None:
+        claims['iat'] = issued
+    if issuer is not None:
+        claims['iss'] = issuer
+    if 'aud' in payload:
+        claims['aud'] = payload['aud']
+    flags = FLAG_STAFF if payload['staff'] else 0
+    if flags:
+        claims['flg'] = flags
+    if payload['profile']:
+        claims['prf'] = payload['profile']
+    return claims
+
+
+def normalize_claims(claims):
+    """
+        return the claims of an access token in the long format, in either format
+        compact tokens are recognized by their 'jti' claim
+    """
+    if 'jti' not in claims:
+        return claims
+    payload = {
+        'token': uuid_decode(claims['jti']),
+        'expires': claims['exp'],
+        'user': uuid_decode(claims['sub']),
+        'profile': claims.get('prf', {}),
+        'staff': bool(claims.get('flg', 0) & FLAG_STAFF),
+    }
+    for claim in ('aud', 'iat', 'iss'):
+        if claim in claims:
+            payload[claim] = claims[claim]
+    return payload
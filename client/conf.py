@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from . import core
+
+
+SETTINGS = (
+    'JWT_PUBLIC_KEY',
+    'AUTH_SERVICE_URL',
+    'AUTH_CLIENT_CACHE_SIZE',
+    'AUTH_JWKS_REFRESH_INTERVAL',
+    'AUTH_REVOCATION_POLL_INTERVAL',
+    'AUTH_REVOCATION_ENCODING',
+    'AUTH_AUDIENCE',
+)
+
+
+def configure_from_settings():
+    """
+        configure the shared verifier from the django settings of the consuming service
+
+        JWT_PUBLIC_KEY or AUTH_SERVICE_URL is required, see client.core.TokenVerifier
+    """
+    return core.configure(
+        public_key=getattr(settings, 'JWT_PUBLIC_KEY', None),
+        service_url=getattr(settings, 'AUTH_SERVICE_URL', None),
+        cache_size=getattr(settings, 'AUTH_CLIENT_CACHE_SIZE', 0),
+        jwks_refresh_interval=getattr(settings, 'AUTH_JWKS_REFRESH_INTERVAL', 300),
+        revocation_poll_interval=getattr(settings, 'AUTH_REVOCATION_POLL_INTERVAL', 10),
+        revocation_encoding=getattr(settings, 'AUTH_REVOCATION_ENCODING', 'ids'),
+        audience=getattr(settings, 'AUTH_AUDIENCE', None),
+    )
+
+
+@receiver(setting_changed)
+def reconfigure(setting, **kwargs):
+    # the verifier is configured again from the settings when it is next used
+    if setting in SETTINGS:
+        core.reset()
@@ -0,0 +1,240 @@
+import asyncio
+import threading
+import time
+import jwt
+from .algorithms import load_public_key
+from .cache import VerifiedTokenCache
+from .claims import normalize_claims
+from .keys import JWKSKeySet, KeysUnavailable
+from .revocation import RevocationList
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class TokenUser:
+    """
+        user populated from the payload of a verified token
+        used in place of a database-backed user model by services consuming tokens
+    """
+
+    def __init__(self, payload):
+        self.id = payload['user']
+        self.profile = payload['profile']
+        self.payload = payload
+
+    def __str__(self):
+        return str(self.id)
+
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
+    @property
+    def is_active(self):
+        return True
+
+    @property
+    def is_staff(self):
+        return self.payload['staff'] == True
+
+
+class AnonymousTokenUser:
+    """
+        user for requests made without a token, when no framework user class is available
+    """
+
+    id = None
+    profile = None
+    payload = None
+    is_authenticated = False
+    is_anonymous = True
+    is_active = False
+    is_staff = False
+
+
+class TokenVerifier:
+    """
+        framework agnostic verifier for tokens issued by the auth service
+
+        'public_key' is a pem encoded key used to verify every token, or provide
+        'service_url' to verify with the keys published by the auth service jwks
+        endpoint and to reject tokens listed by its revocation feed
+
+        'cache_size' enables a bounded cache of verified token payloads
+
+        'audience' is the name of this service's claim set, tokens issued for another
+        audience are rejected, tokens w/o an audience are accepted by every service
+
+        while the keys of the auth service are unavailable, verification raises
+        KeysUnavailable, the adapters respond w/ a 503 instead of rejecting the token
+
+        the framework adapters in this package share one verifier per process,
+        so they share its key set, revocation list, and cache
+    """
+
+    def __init__(self, public_key=None, service_url=None, cache_size=0,
+                 jwks_refresh_interval=300, revocation_poll_interval=10,
+                 revocation_encoding='ids', audience=None):
+        if not public_key and not service_url:
+            raise ValueError('a public key or the auth service url is required')
+        self.public_key = public_key
+        self.keyset = None
+        self.revocations = None
+        if service_url:
+            service_url = service_url.rstrip('/')
+            self.keyset = JWKSKeySet(
+                f'{service_url}/.well-known/jwks.json',
+                refresh_interval=jwks_refresh_interval,
+            )
+            self.revocations = RevocationList(
+                f'{service_url}/token/revocations/',
+                poll_interval=revocation_poll_interval,
+                encoding=revocation_encoding,
+            )
+        self.cache = VerifiedTokenCache(cache_size) if cache_size else None
+        self.audience = audience
+        self.start()
+
+    def start(self):
+        """
+            start fetching keys and revocations in background threads, so they're
+            ready before the first request, safe to call repeatedly
+        """
+        if self.keyset is not None:
+            self.keyset.start()
+            self.revocations.start()
+
+    def extract(self, header, prefix='Token'):
+        """
+            extract the token from an authorization header value ('<prefix> <token>')
+            return None when the header is for another scheme, raise InvalidToken if malformed
+        """
+        if isinstance(header, str):
+            header = header.encode('latin-1')
+        parts = (header or b'').split()
+        if not parts or parts[0].lower() != prefix.lower().encode():
+            return None
+        if len(parts) != 2:
+            raise InvalidToken('invalid token')
+        try:
+            return parts[1].decode()
+        except UnicodeError:
+            raise InvalidToken('invalid token')
+
+    def verification_key(self, token):
+        if self.keyset is None:
+            return load_public_key(self.public_key)
+        # the key is selected by the kid header, an unknown kid has no key
+        return self.keyset.get(jwt.get_unverified_header(token).get('kid'))
+
+    def decode(self, token):
+        """
+            verify the signature of a token, return the payload or None if it's invalid
+        """
+        # a token verified earlier is served from the cache until it expires
+        if self.cache is not None:
+            payload = self.cache.get(token)
+            if payload is not None:
+                return payload
+        return self.decode_uncached(token)
+
+    def decode_uncached(self, token):
+        try:
+            # the key is parsed once, the algorithm is selected by the key type
+            key, algorithm = self.verification_key(token)
+            # expiry is checked by check(), for tokens in either format
+            claims = jwt.decode(
+                token, key, algorithms=[algorithm],
+                options={'verify_aud': False, 'verify_exp': False},
+            )
+            # tokens in the compact format are read w/ the same names as the long format
+            payload = normalize_claims(claims)
+        except KeysUnavailable:
+            raise
+        except Exception:
+            return None
+        if not self.accepts_audience(payload.get('aud')):
+            return None
+        if self.cache is not None:
+            self.cache.set(token, payload)
+        return payload
+
+    def accepts_audience(self, audience):
+        if audience is None or self.audience is None:
+            return True
+        if isinstance(audience, str):
+            return audience == self.audience
+        return self.audience in audience
+
+    def is_expired(self, payload):
+        return payload['expires'] < int(time.time())
+
+    def is_revoked(self, payload):
+        if self.revocations is None:
+            return False
+        self.revocations.start()
+        return payload.get('token') in self.revocations
+
+    def check(self, payload):
+        # return the payload if it is not expired or revoked
+        try:
+            if payload and not self.is_expired(payload) and not self.is_revoked(payload):
+                return payload
+        except (KeyError, TypeError):
+            pass
+        return None
+
+    def verify(self, token):
+        """
+            return the payload of a valid token, or None if it's invalid, expired, or revoked
+        """
+        return self.check(self.decode(token))
+
+    async def verify_async(self, token):
+        """
+            async version of verify(), cached tokens are verified on the event loop,
+            signature checks (and the first key fetch) run in the default executor
+        """
+        payload = self.cache.get(token) if self.cache is not None else None
+        if payload is None:
+            loop = asyncio.get_running_loop()
+            payload = await loop.run_in_executor(None, self.decode_uncached, token)
+        return self.check(payload)
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def configure(**options):
+    """
+        create the verifier shared by the adapters in this process, see TokenVerifier
+    """
+    global _verifier
+    with _verifier_lock:
+        _verifier = TokenVerifier(**options)
+    return _verifier
+
+
+def get_verifier():
+    """
+        return the shared verifier, when configure() has not been called and django
+        is in use, the verifier is configured from the django settings
+    """
+    verifier = _verifier
+    if verifier is None:
+        from .conf import configure_from_settings
+        verifier = configure_from_settings()
+    return verifier
+
+
+def reset():
+    global _verifier
+    with _verifier_lock:
+        _verifier = None
@@ -0,0 +1,119 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from urllib.request import urlopen
+from .algorithms import key_from_jwk
+
+
+logger = logging.getLogger(__name__)
+
+
+MAX_AGE_PATTERN = re.compile(r'max-age=(\d+)')
+
+
+class KeysUnavailable(Exception):
+    """
+        raised when no keys have been fetched from the jwks endpoint, tokens can't be verified
+    """
+
+
+class JWKSKeySet:
+    """
+        public keys published by the auth service jwks endpoint, indexed by kid
+
+        keys are fetched by a background thread, started w/ start(), and refreshed
+        after the max-age advertised by the endpoint, until a refresh succeeds the
+        current keys continue to be used (stale-while-revalidate), failed fetches are
+        retried w/ a backoff, from 1 second up to the refresh interval
+
+        requests made before the first fetch completes wait for it, up to 'timeout'
+        seconds, while no keys are available get() raises KeysUnavailable w/o waiting
+
+        an unknown kid wakes the refresh thread early, so a newly rotated key is
+        picked up quickly, these refreshes are limited to one per 'min_refresh_interval'
+    """
+
+    def __init__(self, url, refresh_interval=300, min_refresh_interval=30, timeout=5):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.refreshed = None
+        self._keys = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._fetched = threading.Event()
+        self._thread_pid = None
+
+    def get(self, kid):
+        """
+            return a (key, algorithm) tuple for a kid, or None when the kid is unknown
+            raise KeysUnavailable when no keys have been fetched
+        """
+        # threads don't survive a fork, this restarts refreshing in a forked worker
+        self.start()
+        keys = self._keys
+        if keys is None:
+            # the fetch runs in the refresh thread, only the first attempt is waited for
+            self._fetched.wait(self.timeout)
+            keys = self._keys
+            if keys is None:
+                raise KeysUnavailable(f'unable to fetch json web keys from {self.url}')
+        key = keys.get(kid)
+        if key is None and time.monotonic() - self.refreshed > self.min_refresh_interval:
+            self._wake.set()
+        return key
+
+    def fetch(self):
+        with urlopen(self.url, timeout=self.timeout) as response:
+            jwks = json.loads(response.read().decode())
+            max_age = MAX_AGE_PATTERN.search(response.headers.get('Cache-Control', ''))
+        return jwks, int(max_age.group(1)) if max_age else None
+
+    def load(self, jwks):
+        keys = {}
+        for jwk in jwks.get('keys', []):
+            try:
+                keys[jwk['kid']] = key_from_jwk(jwk)
+            except (KeyError, TypeError, ValueError):
+                logger.warning('ignoring unsupported json web key %r', jwk.get('kid'))
+        self._keys = keys
+        self.refreshed = time.monotonic()
+        self._fetched.set()
+
+    def refresh(self):
+        jwks, max_age = self.fetch()
+        self.load(jwks)
+        if max_age is not None:
+            self.refresh_interval = max_age
+
+    def run(self):
+        backoff = 1
+        while True:
+            try:
+                self.refresh()
+                delay, backoff = self.refresh_interval, 1
+            except Exception:
+                # keep serving the current keys until the endpoint is reachable again
+                logger.exception('unable to refresh json web keys from %s', self.url)
+                delay, backoff = backoff, min(backoff * 2, self.refresh_interval)
+            # requests waiting for the first fetch stop waiting, whatever the outcome
+            self._fetched.set()
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def start(self):
+        """
+            start refreshing in a background thread, safe to call repeatedly
+            threads don't survive a fork, so refreshing is started again in a forked worker
+        """
+        if self.url is None or self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid != os.getpid():
+                thread = threading.Thread(target=self.run, name='auth-jwks-refresh', daemon=True)
+                thread.start()
+                self._thread_pid = os.getpid()
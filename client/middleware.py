@@ -0,0 +1,82 @@
+import asyncio
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from . import core
+from .authentication import TokenUser
+from .core import get_verifier
+
+
+class TokenAuthenticationMiddleware:
+    """
+        Django middleware for use with JWT tokens provided by auth-service server
+
+        sets request.user to a TokenUser (or AnonymousUser without a token) and
+        request.auth to the token payload, invalid tokens receive a 401 response,
+        while the keys of the auth service are unavailable tokens receive a 503
+
+        the middleware runs in sync and async (ASGI) django applications
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    token_prefix_string = 'Token'
+    invalid_token_error_message = 'invalid token'
+    unavailable_error_message = 'authentication is temporarily unavailable'
+    unavailable_retry_after = 5
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # mark the instance as a coroutine function, so django awaits __call__
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        try:
+            token = self.extract_token(request)
+        except core.InvalidToken:
+            return self.invalid_token_response()
+        payload = None
+        if token:
+            try:
+                payload = get_verifier().verify(token)
+            except core.KeysUnavailable:
+                return self.unavailable_response()
+            if payload is None:
+                return self.invalid_token_response()
+        self.populate_request(request, payload)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        try:
+            token = self.extract_token(request)
+        except core.InvalidToken:
+            return self.invalid_token_response()
+        payload = None
+        if token:
+            try:
+                payload = await get_verifier().verify_async(token)
+            except core.KeysUnavailable:
+                return self.unavailable_response()
+            if payload is None:
+                return self.invalid_token_response()
+        self.populate_request(request, payload)
+        return await self.get_response(request)
+
+    def extract_token(self, request):
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        return get_verifier().extract(header, self.token_prefix_string)
+
+    def populate_request(self, request, payload):
+        request.user = TokenUser(payload) if payload else AnonymousUser()
+        request.auth = payload
+
+    def invalid_token_response(self):
+        return JsonResponse({'detail': self.invalid_token_error_message}, status=401)
+
+    def unavailable_response(self):
+        response = JsonResponse({'detail': self.unavailable_error_message}, status=503)
+        response['Retry-After'] = str(self.unavailable_retry_after)
+        return response
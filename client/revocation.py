@@ -0,0 +1,170 @@
+import base64
+import hashlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+
+logger = logging.getLogger(__name__)
+
+
+def token_id_bytes(token_id):
+    # token ids are uuids, they are compared as their 16 byte binary form
+    return uuid.UUID(str(token_id)).bytes
+
+
+def encode_ids(token_ids):
+    """
+        encode token ids as a sorted array of 16 byte binary uuids, base64 encoded
+    """
+    return base64.b64encode(b''.join(sorted(token_id_bytes(i) for i in token_ids))).decode()
+
+
+def decode_ids(encoded):
+    """
+        decode a base64 encoded array of binary uuids to a set of 16 byte values
+    """
+    data = base64.b64decode(encoded)
+    if len(data) % 16:
+        raise ValueError('binary id array is not a multiple of 16 bytes')
+    return {data[i:i + 16] for i in range(0, len(data), 16)}
+
+
+class BloomFilter:
+    """
+        fixed size bloom filter of binary token ids
+
+        membership tests can return false positives at roughly the error rate
+        the filter was sized for, but never false negatives
+    """
+
+    def __init__(self, size, hashes, bits=None):
+        self.size = size
+        self.hashes = hashes
+        self.bits = bytearray(bits) if bits is not None else bytearray((size + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, count, error_rate):
+        count = max(count, 1)
+        size = max(8, math.ceil(-count * math.log(error_rate) / math.log(2) ** 2))
+        hashes = max(1, round(size / count * math.log(2)))
+        return cls(size, hashes)
+
+    def positions(self, value):
+        # double hashing, two 64 bit halves of one digest produce every position
+        digest = hashlib.blake2b(value, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, value):
+        for position in self.positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self.positions(value))
+
+    def to_dict(self):
+        return {
+            'size': self.size,
+            'hashes': self.hashes,
+            'bits': base64.b64encode(bytes(self.bits)).decode(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        bloom = cls(int(data['size']), int(data['hashes']), base64.b64decode(data['bits']))
+        if len(bloom.bits) != (bloom.size + 7) // 8:
+            raise ValueError('bloom filter bits do not match its size')
+        return bloom
+
+
+class RevocationList:
+    """
+        revoked token ids published by the auth service revocation feed
+
+        a full snapshot is fetched first (as a sorted id array or a bloom filter),
+        after that only the ids revoked since the last sequence number are fetched,
+        every 'resync_interval' seconds a new snapshot replaces the list, which drops
+        ids of tokens that have since expired and keeps memory use bounded
+
+        lookups are set and bloom filter membership tests, they never block on the network
+    """
+
+    def __init__(self, url, poll_interval=10, resync_interval=900, encoding='ids', timeout=5):
+        self.url = url
+        self.poll_interval = poll_interval
+        self.resync_interval = resync_interval
+        self.encoding = encoding
+        self.timeout = timeout
+        self.sequence = None
+        self.synced = None
+        self._ids = frozenset()
+        self._bloom = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+
+    def __contains__(self, token_id):
+        try:
+            value = token_id_bytes(token_id)
+        except (TypeError, ValueError):
+            return False
+        bloom = self._bloom
+        return value in self._ids or (bloom is not None and value in bloom)
+
+    def apply(self, data):
+        """
+            apply a response from the revocation feed, either a snapshot or a delta
+        """
+        ids = decode_ids(data['ids']) if 'ids' in data else set()
+        with self._lock:
+            if data.get('delta'):
+                self._ids = self._ids | ids
+            else:
+                self._bloom = BloomFilter.from_dict(data['bloom']) if 'bloom' in data else None
+                self._ids = frozenset(ids)
+                self.synced = time.monotonic()
+            self.sequence = int(data['sequence'])
+
+    def fetch(self):
+        resync = self.synced is None or time.monotonic() - self.synced > self.resync_interval
+        if resync or self.sequence is None:
+            query = {'encoding': self.encoding}
+        else:
+            query = {'since': self.sequence}
+        with urlopen(f'{self.url}?{urlencode(query)}', timeout=self.timeout) as response:
+            return json.loads(response.read().decode())
+
+    def poll(self):
+        self.apply(self.fetch())
+
+    def run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception:
+                # keep serving the last known list until the feed is reachable again
+                logger.exception('unable to poll the revocation feed at %s', self.url)
+            time.sleep(self.poll_interval)
+
+    def start(self):
+        """
+            start polling in a background thread, safe to call repeatedly
+            threads don't survive a fork, so polling is started again in a forked worker
+        """
+        if self.url is None or self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid != os.getpid():
+                self._thread = threading.Thread(
+                    target=self.run, name='auth-revocation-poller', daemon=True
+                )
+                self._thread.start()
+                self._thread_pid = os.getpid()
@@ -1,12 +1,21 @@
+import asyncio
 import unittest
+import jwt
+import time
 from time import sleep
+from django.http import HttpResponse
 from django.conf import settings
+from django.test import override_settings
 from django.test.client import RequestFactory
 from rest_framework import status
 from rest_framework.test import APITestCase
 from rest_framework.exceptions import AuthenticationFailed
 from users.models import User
-from .authentication import TokenUser, TokenAuthentication
+from .authentication import TokenUser, TokenAuthentication, get_token_cache
+from .core import TokenVerifier
+from .keys import JWKSKeySet, KeysUnavailable
+from . import asgi, middleware
+from .revocation import RevocationList
 
 
 class TokenClientTests(APITestCase):
@@ -46,6 +55,20 @@ class TokenClientTests(APITestCase):
         self.assertEqual(user.is_staff, user_detail['is_staff'])
         self.assertEqual(user.profile, user_detail['profile'])
 
+    @override_settings(JWT_COMPACT_CLAIMS=True)
+    def test_hydrate_admin_user_from_compact_token(self):
+        auth_response = self.client \
+            .post('/token/login/', self.admin_user_credentials, format='json')
+        token = auth_response.json()['token']
+        # the compact format uses registered claims, read w/ the names of the long format
+        self.assertIn('jti', jwt.decode(token, verify=False))
+        fake_request = self.requst_factory.get('/', {}, HTTP_AUTHORIZATION=f'Token {token}')
+        user, payload = TokenAuthentication().authenticate(fake_request)
+        self.assertEqual(type(user), TokenUser)
+        self.assertEqual(str(user.id), str(self.admin_user.id))
+        self.assertTrue(user.is_staff)
+        self.assertEqual(payload['iss'], settings.JWT_ISSUER)
+
     def test_hydrate_admin_user_from_jwt_token(self):
         # get a token from the auth service
         auth_response = self.client \
@@ -91,6 +114,31 @@ class TokenClientTests(APITestCase):
         with self.assertRaises(AuthenticationFailed):
             token_result = TokenAuthentication().authenticate(fake_request)
 
+    @override_settings(AUTH_CLIENT_CACHE_SIZE=10)
+    def test_verified_token_is_cached(self):
+        get_token_cache().clear()
+        # get a token from the auth service
+        auth_response = self.client \
+            .post('/token/login/', self.test_user_credentials, format='json')
+        token = auth_response.json()['token']
+        auth_header = f'Token {token}'
+        fake_request = self.requst_factory.get('/', {}, HTTP_AUTHORIZATION=auth_header)
+        # the first request verifies the token, the second is served from the cache
+        hits = get_token_cache().hits
+        first_user, _ = TokenAuthentication().authenticate(fake_request)
+        second_user, _ = TokenAuthentication().authenticate(fake_request)
+        self.assertEqual(get_token_cache().hits, hits + 1)
+        self.assertEqual(first_user.id, second_user.id)
+
+    @override_settings(AUTH_CLIENT_CACHE_SIZE=10)
+    def test_invalid_token_is_not_cached(self):
+        get_token_cache().clear()
+        auth_header = f'Token invalid-token-string-is-not-anything'
+        fake_request = self.requst_factory.get('/', {}, HTTP_AUTHORIZATION=auth_header)
+        with self.assertRaises(AuthenticationFailed):
+            TokenAuthentication().authenticate(fake_request)
+        self.assertEqual(len(get_token_cache()), 0)
+
     def test_return_none_on_no_auth(self):
         # setup a fake request with no auth header
         auth_header = f'Token invalid-token-string-is-not-anything'
@@ -98,3 +146,152 @@ class TokenClientTests(APITestCase):
         # a request without the auth header will return none
         token_result = TokenAuthentication().authenticate(fake_request)
         self.assertEqual(token_result, None)
+
+
+class RevocationFeedTests(APITestCase):
+
+    def setUp(self):
+        self.test_user_credentials = {
+            'email': 'test@example.com',
+            'password': 'password1234',
+        }
+        self.test_user = User.objects.create_user(**self.test_user_credentials)
+
+    def _login_and_revoke(self):
+        # get a token from the auth service, then revoke it
+        auth_response = self.client \
+            .post('/token/login/', self.test_user_credentials, format='json')
+        auth = auth_response.json()
+        self.client.post('/token/revoke/', {'refresh': auth['refresh']}, format='json')
+        return TokenAuthentication().decode_token(auth['token'])['token']
+
+    def test_snapshot_contains_revoked_token(self):
+        token_id = self._login_and_revoke()
+        for encoding in ('ids', 'bloom'):
+            response = self.client.get('/token/revocations/', {'encoding': encoding})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            revocations = RevocationList(url=None)
+            revocations.apply(response.json())
+            self.assertTrue(token_id in revocations)
+
+    def test_delta_contains_revoked_token(self):
+        # start from a snapshot taken before the revoke
+        response = self.client.get('/token/revocations/')
+        revocations = RevocationList(url=None)
+        revocations.apply(response.json())
+        token_id = self._login_and_revoke()
+        self.assertFalse(token_id in revocations)
+        # the delta since the snapshot includes the revoked token
+        response = self.client.get('/token/revocations/', {'since': revocations.sequence})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()['delta'])
+        revocations.apply(response.json())
+        self.assertTrue(token_id in revocations)
+
+    def test_invalid_since_is_rejected(self):
+        response = self.client.get('/token/revocations/', {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class JWKSKeySetTests(APITestCase):
+
+    def setUp(self):
+        self.test_user_credentials = {
+            'email': 'test@example.com',
+            'password': 'password1234',
+        }
+        self.test_user = User.objects.create_user(**self.test_user_credentials)
+
+    def test_verify_token_with_published_key(self):
+        # load the key set from the auth service jwks endpoint
+        keyset = JWKSKeySet(url=None)
+        keyset.load(self.client.get('/.well-known/jwks.json').json())
+        # get a token from the auth service
+        auth_response = self.client \
+            .post('/token/login/', self.test_user_credentials, format='json')
+        token = auth_response.json()['token']
+        # the token is verified with the key matching its kid
+        key, algorithm = keyset.get(jwt.get_unverified_header(token)['kid'])
+        payload = jwt.decode(token, key, algorithms=[algorithm])
+        self.assertEqual(payload['user'], str(self.test_user.id))
+
+    def test_unknown_kid_has_no_key(self):
+        keyset = JWKSKeySet(url=None)
+        keyset.load(self.client.get('/.well-known/jwks.json').json())
+        self.assertIsNone(keyset.get('unknown-kid'))
+
+    def test_unreachable_service_is_unavailable(self):
+        # nothing listens on the discard port, the fetch fails in the refresh thread
+        verifier = TokenVerifier(service_url='http://127.0.0.1:9', revocation_poll_interval=60)
+        verifier.keyset.timeout = 1
+        auth_response = self.client \
+            .post('/token/login/', self.test_user_credentials, format='json')
+        token = auth_response.json()['token']
+        with self.assertRaises(KeysUnavailable):
+            verifier.verify(token)
+        # after the failed fetch requests don't wait for the endpoint
+        start = time.monotonic()
+        with self.assertRaises(KeysUnavailable):
+            verifier.verify(token)
+        self.assertLess(time.monotonic() - start, 0.5)
+        # the adapters respond w/ a 503, not an invalid token
+        messages = []
+        async def send(message):
+            messages.append(message)
+        auth_middleware = asgi.TokenAuthenticationMiddleware(None, verifier=verifier)
+        scope = {'type': 'http', 'headers': [(b'authorization', f'Token {token}'.encode())]}
+        asyncio.run(auth_middleware(scope, None, send))
+        self.assertEqual(messages[0]['status'], 503)
+
+
+class ClientAdapterTests(APITestCase):
+
+    def setUp(self):
+        self.requst_factory = RequestFactory()
+        self.test_user_credentials = {
+            'email': 'test@example.com',
+            'password': 'password1234',
+        }
+        self.test_user = User.objects.create_user(**self.test_user_credentials)
+        auth_response = self.client \
+            .post('/token/login/', self.test_user_credentials, format='json')
+        self.token = auth_response.json()['token']
+
+    def test_django_middleware(self):
+        get_response = lambda request: HttpResponse(str(request.user.id))
+        auth_middleware = middleware.TokenAuthenticationMiddleware(get_response)
+        # a valid token populates request.user
+        fake_request = self.requst_factory.get('/', HTTP_AUTHORIZATION=f'Token {self.token}')
+        response = auth_middleware(fake_request)
+        self.assertEqual(response.content.decode(), str(self.test_user.id))
+        self.assertEqual(type(fake_request.user), TokenUser)
+        # an invalid token is rejected
+        fake_request = self.requst_factory.get('/', HTTP_AUTHORIZATION='Token invalid')
+        self.assertEqual(auth_middleware(fake_request).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_async_django_middleware(self):
+        async def get_response(request):
+            return HttpResponse(str(request.user.id))
+        auth_middleware = middleware.TokenAuthenticationMiddleware(get_response)
+        fake_request = self.requst_factory.get('/', HTTP_AUTHORIZATION=f'Token {self.token}')
+        response = asyncio.run(auth_middleware(fake_request))
+        self.assertEqual(response.content.decode(), str(self.test_user.id))
+
+    def test_asgi_middleware(self):
+        scopes, messages = [], []
+        async def app(scope, receive, send):
+            scopes.append(scope)
+        async def receive():
+            return {'type': 'http.request'}
+        async def send(message):
+            messages.append(message)
+        auth_middleware = asgi.TokenAuthenticationMiddleware(app)
+        # a valid token populates scope['user']
+        scope = {'type': 'http', 'headers': [(b'authorization', f'Token {self.token}'.encode())]}
+        asyncio.run(auth_middleware(scope, receive, send))
+        self.assertEqual(scopes[0]['user'].id, str(self.test_user.id))
+        # an invalid token is rejected w/o calling the application
+        scope = {'type': 'http', 'headers': [(b'authorization', b'Token invalid')]}
+        asyncio.run(auth_middleware(scope, receive, send))
+        self.assertEqual(len(scopes), 1)
+        self.assertEqual(messages[0]['status'], 401)
@@ -0,0 +1,88 @@
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core import signals
+from django.db import connections
+from django.db.backends.signals import connection_created
+from core import metrics
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionStats:
+    """
+        counts of database connections opened and reused by this worker process
+    """
+
+    def __init__(self):
+        self.opened = 0
+        self.reused = 0
+        self.health_checks = 0
+        self.health_check_failures = 0
+        self._lock = threading.Lock()
+
+    def increment(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+stats = ConnectionStats()
+
+
+def check_connection(connection):
+    """
+        close a persistent connection that can no longer be used, before the request uses it
+
+        a connection idle for DATABASE_HEALTH_CHECK_IDLE seconds is checked w/ a query,
+        the server, a proxy, or a firewall can drop it while idle, when closed the
+        connection is opened again on first use
+    """
+    if connection.connection is None:
+        return
+    idle = settings.DATABASE_HEALTH_CHECK_IDLE
+    last_used = getattr(connection, 'last_used', None)
+    if idle is not None and last_used is not None and time.monotonic() - last_used >= idle:
+        stats.increment('health_checks')
+        if not connection.is_usable():
+            stats.increment('health_check_failures')
+            logger.warning('closing unusable database connection %r', connection.alias)
+            connection.close()
+            return
+    stats.increment('reused')
+
+
+def check_connections(**kwargs):
+    # connections are per thread, these are the connections of the thread serving the request
+    for connection in connections.all():
+        check_connection(connection)
+
+
+def mark_connections(**kwargs):
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.last_used = now
+
+
+def connection_opened(sender, connection, **kwargs):
+    stats.increment('opened')
+    connection.last_used = None
+
+
+# these run after django's close_old_connections, which closes expired connections
+signals.request_started.connect(check_connections)
+signals.request_finished.connect(mark_connections)
+connection_created.connect(connection_opened)
+
+
+def open_connections():
+    return sum(connection.connection is not None for connection in connections.all())
+
+
+metrics.register('database_connections_opened', lambda: stats.opened)
+metrics.register('database_connections_reused', lambda: stats.reused)
+metrics.register('database_health_checks', lambda: stats.health_checks)
+metrics.register('database_health_check_failures', lambda: stats.health_check_failures)
+metrics.register('database_connections_open', open_connections)
@@ -0,0 +1,173 @@
+import io
+import json
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signals
+from rest_framework.utils.json import strict_constant
+
+
+# pre-rendered bodies, as the DRF views render them (compact json)
+STATUS_BODY = b''
+VALID_BODY = b'{"valid":true}'
+NOT_VALID_BODY = b'{"valid":false}'
+INVALID_TOKEN_BODY = b'{"error":"invalid token"}'
+
+STATUS_TEXT = {200: '200 OK', 400: '400 Bad Request'}
+
+
+def status_view(body):
+    return 200, STATUS_BODY, 'GET, HEAD, OPTIONS'
+
+
+def inspect_view(body):
+    from tokens.models import Token
+    try:
+        # as DRF's JSONParser, utf-8 w/o NaN or Infinity
+        data = json.loads(body.decode('utf-8'), parse_constant=strict_constant)
+    except ValueError:
+        # DRF describes the parse error, the full stack handles it
+        return None
+    if not isinstance(data, dict):
+        return None
+    if 'token' in data and type(data['token']) == str:
+        token = Token.lookup(Token.decode_payload(data['token']))
+        if token:
+            return 200, VALID_BODY if token.is_valid else NOT_VALID_BODY, 'POST, OPTIONS'
+    return 400, INVALID_TOKEN_BODY, 'POST, OPTIONS'
+
+
+ROUTES = {
+    ('GET', '/status/'): status_view,
+    ('POST', '/token/inspect/'): inspect_view,
+}
+
+
+def is_json(content_type):
+    # exactly the type DRF's JSONParser accepts, in the charset it decodes
+    media_type, _, parameters = content_type.partition(';')
+    return media_type.strip() == 'application/json' \
+        and parameters.replace(' ', '').lower() in ('', 'charset=utf-8')
+
+
+def route(method, path, headers):
+    """
+        return the fast path view for a request, or None when the request is handled
+        by django, requests w/ an origin (cors), credentials, a non json body, or
+        in DEBUG (inspect includes the payload) always use the full stack
+    """
+    view = ROUTES.get((method, path))
+    if view is None or settings.DEBUG:
+        return None
+    if 'origin' in headers or 'authorization' in headers:
+        return None
+    if method == 'POST' and not is_json(headers.get('content-type', '')):
+        return None
+    return view
+
+
+def respond(view, body, sender):
+    # signal the request as django's handlers do, which manages database connections
+    signals.request_started.send(sender=sender)
+    try:
+        return view(body)
+    except Exception:
+        # django handles the request again, w/ its 500 response and logging
+        signals.got_request_exception.send(sender=sender, request=None)
+        return None
+    finally:
+        signals.request_finished.send(sender=sender)
+
+
+def response_headers(body, allow):
+    # DRF drops the content type of an empty body, the cors middleware always varies on origin
+    headers = [('Content-Type', 'application/json')] if body else []
+    return headers + [('Allow', allow), ('Vary', 'Origin')]
+
+
+class FastPathWSGI:
+    """
+        WSGI middleware answering the load balancer and gateway endpoints directly
+
+        GET /status/ and POST /token/inspect/ skip django's request handling and DRF
+        (content negotiation, parsers, authentication, renderers), the json body is
+        parsed directly and the responses are pre-rendered, identical to the views,
+        other requests, and anything the fast path doesn't handle, go to django
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    def __call__(self, environ, start_response):
+        headers = {
+            'origin': environ.get('HTTP_ORIGIN'),
+            'authorization': environ.get('HTTP_AUTHORIZATION'),
+            'content-type': environ.get('CONTENT_TYPE', ''),
+        }
+        headers = {name: value for name, value in headers.items() if value is not None}
+        view = route(environ['REQUEST_METHOD'], environ.get('PATH_INFO'), headers)
+        if view is None:
+            return self.application(environ, start_response)
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return self.application(environ, start_response)
+        body = environ['wsgi.input'].read(length) if length else b''
+        result = respond(view, body, self.__class__)
+        if result is None:
+            # the body was read, django reads it again from a copy
+            environ['wsgi.input'] = io.BytesIO(body)
+            return self.application(environ, start_response)
+        status, content, allow = result
+        start_response(STATUS_TEXT[status], response_headers(content, allow))
+        return [content]
+
+
+class FastPathASGI:
+    """
+        ASGI version of FastPathWSGI, the views run in a thread as they use the database
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.application(scope, receive, send)
+        headers = {
+            name.decode('latin-1').lower(): value.decode('latin-1')
+            for name, value in scope.get('headers', [])
+        }
+        view = route(scope['method'], scope['path'], headers)
+        if view is None:
+            return await self.application(scope, receive, send)
+        body, more_body = b'', True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+        result = await sync_to_async(respond, thread_sensitive=True)(view, body, self.__class__)
+        if result is None:
+            # django receives the body that was already read
+            replayed = False
+
+            async def replay():
+                nonlocal replayed
+                if replayed:
+                    return await receive()
+                replayed = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+
+            return await self.application(scope, replay, send)
+        status, content, allow = result
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (name.lower().encode(), value.encode())
+                for name, value in response_headers(content, allow)
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': content})
+
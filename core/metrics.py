@@ -0,0 +1,23 @@
+import threading
+
+
+_metrics = {}
+_lock = threading.Lock()
+
+
+def register(name, collect):
+    """
+        register a metric, 'collect' is called w/o arguments to read its current value
+        registering a name a second time replaces the metric
+    """
+    with _lock:
+        _metrics[name] = collect
+
+
+def collect():
+    """
+        return a dict of the current value of every registered metric
+    """
+    with _lock:
+        metrics = dict(_metrics)
+    return {name: collect() for name, collect in sorted(metrics.items())}
@@ -0,0 +1,42 @@
+import time
+from unittest import mock
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from .db import check_connection, stats
+
+
+class ConnectionHealthCheckTest(APITestCase):
+
+    def setUp(self):
+        # open the connection, and make it idle longer than the health check threshold
+        connection.ensure_connection()
+        connection.last_used = time.monotonic() - 60
+
+    def test_usable_connection_is_reused(self):
+        reused, checks = stats.reused, stats.health_checks
+        with override_settings(DATABASE_HEALTH_CHECK_IDLE=30):
+            check_connection(connection)
+        self.assertEqual((stats.reused, stats.health_checks), (reused + 1, checks + 1))
+        self.assertIsNotNone(connection.connection)
+
+    def test_unusable_connection_is_closed(self):
+        failures = stats.health_check_failures
+        # the test transaction can't be closed, the connection is reported unusable
+        with override_settings(DATABASE_HEALTH_CHECK_IDLE=30), \
+                mock.patch.object(connection, 'is_usable', return_value=False), \
+                mock.patch.object(connection, 'close') as close:
+            check_connection(connection)
+        close.assert_called_once()
+        self.assertEqual(stats.health_check_failures, failures + 1)
+
+    def test_recent_connection_is_not_checked(self):
+        connection.last_used = time.monotonic()
+        with mock.patch.object(connection, 'is_usable') as is_usable:
+            check_connection(connection)
+        is_usable.assert_not_called()
+
+    def test_metrics(self):
+        response = self.client.get('/status/metrics/')
+        self.assertIn('database_connections_opened', response.json())
+        self.assertEqual(response.json()['database_connections_open'], 1)
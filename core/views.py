@@ -1,9 +1,24 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.status import HTTP_200_OK
+from . import metrics
 
 
 class StatusView(APIView):
 
     def get(self, request, *args, **kwargs):
         return Response(status=HTTP_200_OK)
+
+
+class MetricsView(APIView):
+    """
+        api for process metrics, such as the depth of the password hashing queue
+
+        values are for the worker process that handles the request
+    """
+
+    authentication_classes = ()
+    permission_classes = ()
+
+    def get(self, request, *args, **kwargs):
+        return Response(metrics.collect(), status=HTTP_200_OK)
@@ -1,5 +1,6 @@
 import os
 from configurations import Configuration as configuration
+from tokens.keys import read_key_files
 
 
 class base(configuration):
@@ -17,10 +18,12 @@ class base(configuration):
         'django.contrib.auth',
         'rest_framework',
         'corsheaders',
+        'core',
         'users',
         'tokens',
         'account',
         'admin',
+        'throttling',
     ]
 
     MIDDLEWARE = [
@@ -31,6 +34,18 @@ class base(configuration):
 
     WSGI_APPLICATION = 'wsgi.application'
 
+    # answer the load balancer and gateway endpoints (/status/, /token/inspect/) before
+    # django's request handling and DRF, see core.fast, applies to wsgi.py and asgi.py
+    FAST_PATH = False
+
+    # set when POSTGRES_HOST is a transaction pooling proxy (pgbouncer), queries keep no
+    # session state and don't use server side cursors, the cache notification listener
+    # holds a session (LISTEN) and connects to POSTGRES_DIRECT_HOST, w/o the proxy,
+    # set the time zone of the database role to UTC, or django sets it per connection
+    POSTGRES_POOLER = os.environ.get('POSTGRES_POOLER', default='false').lower() == 'true'
+    POSTGRES_DIRECT_HOST = os.environ.get('POSTGRES_DIRECT_HOST')
+    POSTGRES_DIRECT_PORT = os.environ.get('POSTGRES_DIRECT_PORT')
+
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.postgresql_psycopg2',
@@ -39,9 +54,16 @@ class base(configuration):
             'PASSWORD': os.environ.get('POSTGRES_PASSWORD'),
             'HOST': os.environ.get('POSTGRES_HOST'),
             'PORT': os.environ.get('POSTGRES_PORT', default='5432'),
+            # seconds a connection is kept open and reused by later requests
+            'CONN_MAX_AGE': int(os.environ.get('POSTGRES_CONN_MAX_AGE', default='600')),
+            'DISABLE_SERVER_SIDE_CURSORS': POSTGRES_POOLER,
         }
     }
 
+    # a persistent connection idle for this many seconds is checked before a request
+    # uses it, and reopened if it was dropped, 0 checks every request, None never checks
+    DATABASE_HEALTH_CHECK_IDLE = 5
+
     EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
     EMAIL_HOST = os.environ.get('EMAIL_HOST')
     EMAIL_PORT = os.environ.get('EMAIL_PORT')
@@ -63,9 +85,33 @@ class base(configuration):
     }
 
     PASSWORD_HASHERS = [
-        'django.contrib.auth.hashers.Argon2PasswordHasher',
+        'users.hashers.Argon2PasswordHasher',
     ]
 
+    # argon2 costs, time cost is in passes and memory cost in KiB, the 'calibrate_argon2'
+    # manage command benchmarks this host and writes recommended values to the .env file
+    ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', default='2'))
+    ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', default='512'))
+    ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', default='2'))
+
+    # threads per worker process used to hash and verify passwords, and the number of
+    # requests that can wait for one, beyond that requests fail w/ a 503 and Retry-After
+    PASSWORD_HASHING_WORKERS = 2
+    PASSWORD_HASHING_QUEUE_SIZE = 8
+    PASSWORD_HASHING_RETRY_AFTER = 1
+
+    # rates of login and password reset attempts, by client ip and by normalized email
+    # 'memory' counts in each worker process, 'postgres' is shared by every worker
+    THROTTLE_BACKEND = 'postgres'
+    THROTTLE_RATES = {
+        'login_ip': '60/min',
+        'login_email': '10/min',
+        'reset_ip': '20/hour',
+        'reset_email': '5/hour',
+    }
+    THROTTLE_MEMORY_SHARDS = 16
+    THROTTLE_MEMORY_MAX_KEYS = 100000
+
     AUTH_PASSWORD_VALIDATORS = [
         {
             'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
@@ -79,27 +125,103 @@ class base(configuration):
 
     AUTH_USER_MODEL = 'users.User'
 
+    # seconds a login can wait before its last_login time is written, logins are
+    # written together in one update per interval, 0 writes each login immediately
+    LAST_LOGIN_MAX_STALENESS = 30
+
     AUTH_TOKEN_EXPIRE_TIME = 3600
 
+    # validation strategy used by tokens.authentication : strict, cached, or stateless
+    AUTH_TOKEN_VALIDATION = 'strict'
+
+    # size and lifetime (seconds) of the per-worker token and user caches
+    AUTH_TOKEN_CACHE_SIZE = 10000
+    AUTH_TOKEN_CACHE_TTL = 60
+
+    # seconds between reloads of the revoked token ids used by the stateless strategy
+    AUTH_REVOCATION_REFRESH_INTERVAL = 60
+
+    # admin lists of tables w/ more rows than this (planner estimate) report an estimated
+    # count, instead of counting every row, an exact count is requested w/ 'count=exact'
+    ADMIN_COUNT_ESTIMATE_THRESHOLD = 100000
+
+    # users ranked by similarity in an admin search, results of the other matching
+    # users follow the ranked results, in list order
+    ADMIN_SEARCH_MAX_USERS = 1000
+
+    # largest batch of the batch inspect api, and the seconds the status of a valid
+    # token and of an invalid (revoked, renewed, expired, unknown) token can be cached
+    INSPECT_BATCH_SIZE = 100
+    INSPECT_MAX_AGE = 5
+    INSPECT_INVALID_MAX_AGE = 300
+
+    # seconds the revocation feed sequence trails the current time, a revocation
+    # committed later than this after its timestamp can be missed by a delta
+    REVOCATION_FEED_SETTLE_TIME = 5
+
+    # false positive rate of revocation feed snapshots encoded as a bloom filter
+    REVOCATION_BLOOM_ERROR_RATE = 0.000001
+
+    # postgres LISTEN/NOTIFY channel used to evict revoked tokens and changed users
+    # from the caches of every worker, set to None to disable notifications
+    AUTH_CACHE_CHANNEL = 'auth_cache'
+
     AUTH_EMAIL_FROM_ADDRESS = 'test@example.com'
 
+    # email is queued in an outbox and sent by the 'send_outbox' manage command, failed
+    # attempts are retried after a delay (seconds) that doubles up to the maximum
+    OUTBOX_BATCH_SIZE = 50
+    OUTBOX_POLL_INTERVAL = 5
+    OUTBOX_RETRY_DELAY = 30
+    OUTBOX_RETRY_MAX_DELAY = 3600
+    OUTBOX_MAX_ATTEMPTS = 10
+
     JWT_ISSUER = 'auth-service'
 
+    # issue access tokens w/ short registered claims (jti, sub, exp, iat, iss), binary
+    # uuids and packed flags, clients read both formats, see client.claims
+    JWT_COMPACT_CLAIMS = False
+
+    # profile keys included in tokens issued for an audience, requested w/ the 'audience'
+    # parameter of login and refresh, for example {'billing': ['name', 'plan']}, tokens
+    # w/o an audience include the keys required by PROFILE_JSON_SCHEMA
+    JWT_AUDIENCES = {}
+
+    # RS256, ES256 or EdDSA, when None the algorithm is selected by the signing key type
+    JWT_ALGORITHM = None
+
     JWT_PUBLIC_KEY = None
     JWT_PRIVATE_KEY = None
 
+    # additional public keys accepted for verification, used during a key rotation
+    JWT_VERIFICATION_KEYS = []
+
+    JWT_PUBLIC_KEY_FILE = f'{BASE_DIR}/jwt.public.key'
+    JWT_PRIVATE_KEY_FILE = f'{BASE_DIR}/jwt.private.key'
+    JWT_VERIFICATION_KEY_FILES = f'{BASE_DIR}/jwt.verify.*.key'
+
+    # signal sent to a worker process to reload the jwt keys from the files above
+    JWT_KEY_RELOAD_SIGNAL = 'SIGHUP'
+
+    # cache lifetime (seconds) of the /.well-known/jwks.json response
+    JWKS_MAX_AGE = 300
+    JWKS_STALE_WHILE_REVALIDATE = 86400
+
+    # json schema user profiles are validated against, defaults in the schema are
+    # filled in, the profile is embedded in every token so its size is limited (bytes)
     PROFILE_JSON_SCHEMA = None
+    PROFILE_MAX_SIZE = 2048
 
     @classmethod
     def setup(cls):
 
         # load private/public keys from config files used for jwt encoding
 
-        with open(f'{cls.BASE_DIR}/jwt.public.key', 'r') as f:
-            cls.JWT_PUBLIC_KEY = f.read()
-
-        with open(f'{cls.BASE_DIR}/jwt.private.key', 'r') as f:
-            cls.JWT_PRIVATE_KEY = f.read()
+        cls.JWT_PRIVATE_KEY, cls.JWT_PUBLIC_KEY, cls.JWT_VERIFICATION_KEYS = read_key_files(
+            cls.JWT_PRIVATE_KEY_FILE,
+            cls.JWT_PUBLIC_KEY_FILE,
+            cls.JWT_VERIFICATION_KEY_FILES,
+        )
 
 
 class production(base):
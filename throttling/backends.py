@@ -0,0 +1,141 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import connection
+from django.dispatch import receiver
+from .models import ThrottleWindow
+
+
+class MemoryBackend:
+    """
+        token buckets kept in the memory of each worker process
+
+        a bucket holds up to 'limit' tokens and refills at 'limit' per 'period', every
+        hit takes a token, buckets are spread over shards that each have their own lock,
+        and each shard keeps its most recently used buckets when it is full
+
+        limits apply per worker process, w/ N workers a key can make up to N times the hits
+    """
+
+    def __init__(self, shards=16, max_keys=100000):
+        self.shards = [
+            (threading.Lock(), {}) for _ in range(shards)
+        ]
+        self.max_shard_keys = max(1, max_keys // shards)
+
+    def hit(self, key, limit, period):
+        """
+            record a hit, return a tuple of whether it's allowed and the seconds to wait if not
+        """
+        lock, buckets = self.shards[hash(key) % len(self.shards)]
+        current = time.monotonic()
+        with lock:
+            # buckets are reinserted on every hit, so the first is the least recently used
+            tokens, updated = buckets.pop(key, (limit, current))
+            tokens = min(limit, tokens + (current - updated) * limit / period)
+            if tokens >= 1:
+                tokens, wait = tokens - 1, None
+            else:
+                wait = (1 - tokens) * period / limit
+            buckets[key] = (tokens, current)
+            if len(buckets) > self.max_shard_keys:
+                del buckets[next(iter(buckets))]
+        return wait is None, wait
+
+    def clear(self):
+        for lock, buckets in self.shards:
+            with lock:
+                buckets.clear()
+
+
+class PostgresBackend:
+    """
+        sliding windows counted in postgres, shared by every worker process
+
+        hits are counted in fixed windows w/ an upsert, the count of the previous
+        window is weighted by how much of it still overlaps the sliding window,
+        one statement records the hit and reads both counts
+    """
+
+    # fraction of hits that also delete expired windows
+    prune_probability = 0.01
+
+    def hit_sql(self):
+        table = connection.ops.quote_name(ThrottleWindow._meta.db_table)
+        return f'''
+            WITH hit AS (
+                INSERT INTO {table} ("key", "slot", "hits", "expires")
+                VALUES (%s, %s, 1, %s)
+                ON CONFLICT ("key", "slot") DO UPDATE SET "hits" = {table}."hits" + 1
+                RETURNING "hits"
+            )
+            SELECT hit."hits", COALESCE(
+                (SELECT "hits" FROM {table} WHERE "key" = %s AND "slot" = %s), 0
+            )
+            FROM hit
+        '''
+
+    def hit(self, key, limit, period):
+        """
+            record a hit, return a tuple of whether it's allowed and the seconds to wait if not
+        """
+        current = time.time()
+        slot, elapsed = divmod(current, period)
+        slot = int(slot)
+        # a window is needed until the end of the window after it
+        expires = datetime.fromtimestamp((slot + 2) * period, timezone.utc)
+        with connection.cursor() as cursor:
+            cursor.execute(self.hit_sql(), [key, slot, expires, key, slot - 1])
+            hits, previous_hits = cursor.fetchone()
+        if random.random() < self.prune_probability:
+            ThrottleWindow.objects.filter(expires__lt=datetime.now(timezone.utc)).delete()
+        overlap = 1 - elapsed / period
+        if previous_hits * overlap + hits <= limit:
+            return True, None
+        # wait until enough of the previous window has slid out, or for the next window
+        if previous_hits and hits < limit:
+            wait = period * (1 - (limit - hits) / previous_hits) - elapsed
+        else:
+            wait = period - elapsed
+        return False, max(wait, 1)
+
+
+BACKENDS = {
+    'memory': MemoryBackend,
+    'postgres': PostgresBackend,
+}
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                try:
+                    backend_class = BACKENDS[settings.THROTTLE_BACKEND]
+                except KeyError:
+                    raise ImproperlyConfigured(
+                        f"unknown THROTTLE_BACKEND '{settings.THROTTLE_BACKEND}'"
+                    )
+                if backend_class is MemoryBackend:
+                    _backend = MemoryBackend(
+                        settings.THROTTLE_MEMORY_SHARDS, settings.THROTTLE_MEMORY_MAX_KEYS
+                    )
+                else:
+                    _backend = backend_class()
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    global _backend
+    if setting.startswith('THROTTLE_'):
+        _backend = None
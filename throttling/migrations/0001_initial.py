@@ -0,0 +1,32 @@
+# Generated by Django 3.1 on 2026-10-18 05:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThrottleWindow',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('key', models.CharField(max_length=100)),
+                ('slot', models.BigIntegerField()),
+                ('hits', models.IntegerField(default=0)),
+                ('expires', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='throttlewindow',
+            index=models.Index(fields=['expires'], name='throttling_expires_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='throttlewindow',
+            constraint=models.UniqueConstraint(fields=('key', 'slot'), name='throttling_key_slot_uniq'),
+        ),
+    ]
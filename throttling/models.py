@@ -0,0 +1,27 @@
+from django.db import models
+
+
+class ThrottleWindow(models.Model):
+    """
+        hits counted for a throttle key in one fixed window of time
+
+        'slot' is the number of the window since the epoch, rows are kept for
+        two windows, the current and the previous one used for a sliding window
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    key = models.CharField(max_length=100)
+    slot = models.BigIntegerField()
+    hits = models.IntegerField(default=0)
+    expires = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'slot'], name='throttling_key_slot_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['expires'], name='throttling_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.key} {self.slot}'
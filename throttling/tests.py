@@ -0,0 +1,57 @@
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from users.models import User
+from .backends import MemoryBackend, PostgresBackend
+from .throttles import normalize_email
+
+
+class LoginThrottleTest(APITestCase):
+
+    def setUp(self):
+        self.test_user = User.objects.create_user('test@example.com', 'password1234')
+        self.invalid_login_request = {
+            'email': 'Test+stuffing@Example.com',
+            'password': 'password5678',
+        }
+
+    @override_settings(THROTTLE_RATES={'login_email': '2/min'})
+    def test_login_is_throttled_by_email(self):
+        for _ in range(2):
+            response = self.client \
+                .post('/token/login/', self.invalid_login_request, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # variations of the address share a limit, and the client is told how long to wait
+        valid_login_request = {'email': 'test@example.com', 'password': 'password1234'}
+        response = self.client \
+            .post('/token/login/', valid_login_request, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+    @override_settings(THROTTLE_RATES={'login_ip': '1/min'}, THROTTLE_BACKEND='memory')
+    def test_login_is_throttled_by_ip(self):
+        response = self.client \
+            .post('/token/login/', self.invalid_login_request, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client \
+            .post('/token/login/', self.invalid_login_request, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+class ThrottleBackendTest(APITestCase):
+
+    def test_memory_backend_refills(self):
+        backend = MemoryBackend(shards=2, max_keys=10)
+        self.assertEqual([backend.hit('key', 2, 60)[0] for _ in range(3)], [True, True, False])
+        # one token is refilled every 30 seconds
+        allowed, wait = backend.hit('key', 2, 60)
+        self.assertLessEqual(wait, 30)
+        self.assertTrue(backend.hit('other', 2, 60)[0])
+
+    def test_postgres_backend_counts_window(self):
+        backend = PostgresBackend()
+        self.assertEqual([backend.hit('key', 2, 3600)[0] for _ in range(3)], [True, True, False])
+        self.assertGreaterEqual(backend.hit('key', 2, 3600)[1], 1)
+
+    def test_normalize_email(self):
+        self.assertEqual(normalize_email(' Test+Tag@Example.com'), 'test@example.com')
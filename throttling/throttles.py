@@ -0,0 +1,97 @@
+import hashlib
+import ipaddress
+from django.conf import settings
+from ipware import get_client_ip
+from rest_framework.throttling import BaseThrottle
+from .backends import get_backend
+
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """
+        parse a rate like '10/min' to a tuple of the number of hits and the period in seconds
+    """
+    hits, period = rate.split('/')
+    return int(hits), PERIODS[period[0]]
+
+
+def normalize_email(email):
+    """
+        reduce the variations of an address that reach one mailbox to a single key,
+        case and '+tag' suffixes are ignored
+    """
+    local, _, domain = email.strip().lower().rpartition('@')
+    return f"{local.split('+', 1)[0]}@{domain}"
+
+
+class Throttle(BaseThrottle):
+    """
+        throttle hits to a view by a key taken from the request, w/ the rate set for
+        'scope' in THROTTLE_RATES, requests w/o a key, or scopes w/o a rate, are not throttled
+
+        DRF checks throttles before the view runs, so a throttled login never
+        reaches the user lookup or password hashing
+    """
+
+    scope = None
+
+    def get_key(self, request):
+        raise NotImplementedError('.get_key() must be overridden')
+
+    def allow_request(self, request, view):
+        rate = settings.THROTTLE_RATES.get(self.scope)
+        key = self.get_key(request)
+        if rate is None or key is None:
+            return True
+        limit, period = parse_rate(rate)
+        allowed, self.wait_time = get_backend().hit(f'{self.scope}:{key}', limit, period)
+        return allowed
+
+    def wait(self):
+        return self.wait_time
+
+
+class IPThrottle(Throttle):
+    """
+        throttle by client ip address, ipv6 clients are keyed by their /64 network,
+        as a single host can use any address in it
+    """
+
+    def get_key(self, request):
+        ip, _ = get_client_ip(request)
+        if ip is None:
+            return None
+        address = ipaddress.ip_address(ip)
+        if address.version == 6:
+            return str(ipaddress.ip_network(f'{ip}/64', strict=False).network_address)
+        return str(address)
+
+
+class EmailThrottle(Throttle):
+    """
+        throttle by the normalized 'email' of the request, stored as a hash
+    """
+
+    def get_key(self, request):
+        email = request.data.get('email') if isinstance(request.data, dict) else None
+        if not isinstance(email, str) or '@' not in email:
+            return None
+        return hashlib.sha256(normalize_email(email).encode()).hexdigest()[:32]
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = 'login_ip'
+
+
+class LoginEmailThrottle(EmailThrottle):
+    scope = 'login_email'
+
+
+class ResetIPThrottle(IPThrottle):
+    scope = 'reset_ip'
+
+
+class ResetEmailThrottle(EmailThrottle):
+    scope = 'reset_email'
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class TokensConfig(AppConfig):
     name = 'tokens'
+
+    def ready(self):
+        from . import signals
+        from .keys import install_reload_handler
+        install_reload_handler()
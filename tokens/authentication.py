@@ -1,10 +1,91 @@
+import copy
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.timezone import now
 from rest_framework.authentication import get_authorization_header, BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from users.models import User
+from .cache import token_cache, user_cache, revocations
 from .models import Token
+from .notifications import start_listener
+
+
+def validate_strict(jwt):
+    """
+        verify the signature and look up the token and user in the database
+        return a (user, token) tuple, or None if the token isn't valid
+    """
+    token = Token.decode_and_lookup(jwt)
+    if not token or token.expired or token.revoked:
+        return None
+    return token.user, token
+
+
+def validate_cached(jwt):
+    """
+        verify the signature and look up the token and user in the lru cache
+        the database is queried on a cache miss, entries live for AUTH_TOKEN_CACHE_TTL
+        return a (user, token) tuple, or None if the token isn't valid
+    """
+    payload = Token.decode_payload(jwt)
+    if not payload or 'token' not in payload:
+        return None
+    token = token_cache.get(payload['token'])
+    if token is None:
+        try:
+            token = Token.objects.select_related('user').get(id=payload['token'])
+        except Token.DoesNotExist:
+            return None
+        token_cache.set(payload['token'], token)
+    # each request gets its own copy, so changes to request.user don't leak into the cache
+    token = copy.deepcopy(token)
+    if token.expired or token.revoked:
+        return None
+    return token.user, token
+
+
+def validate_stateless(jwt):
+    """
+        trust the signature and expire time of the token, reject revoked tokens
+        the user is looked up in the lru cache, the token is never queried
+        return a (user, payload) tuple, or None if the token isn't valid
+    """
+    payload = Token.decode_payload(jwt)
+    try:
+        if payload['expires'] < int(now().timestamp()):
+            return None
+        if payload['token'] in revocations:
+            return None
+        user_id = payload['user']
+    except (KeyError, TypeError):
+        return None
+    user = user_cache.get(user_id)
+    if user is None:
+        try:
+            user = User.objects.get(id=user_id)
+        except User.DoesNotExist:
+            return None
+        user_cache.set(user_id, user)
+    return copy.deepcopy(user), payload
+
+
+VALIDATION_STRATEGIES = {
+    'strict': validate_strict,
+    'cached': validate_cached,
+    'stateless': validate_stateless,
+}
 
 
 class TokenAuthentication(BaseAuthentication):
+    """
+        DRF authentication component for tokens issued by this service
+
+        tokens are validated using the AUTH_TOKEN_VALIDATION strategy :
+        'strict' looks up the token and user in the database for every request
+        'cached' caches the token and user lookup in each worker
+        'stateless' trusts the signature, checks revocations, and caches the user
+    """
 
     keyword = 'Token'
     error_message = 'invalid token'
@@ -14,11 +95,23 @@ class TokenAuthentication(BaseAuthentication):
         jwt = self.extract_jwt(request)
         if jwt:
             # fail if token is invalid, expired, or revoked
-            token = Token.decode_and_lookup(jwt)
-            if not token or token.expired or token.revoked:
+            result = self.get_validation_strategy()(jwt)
+            if result is None:
                 raise AuthenticationFailed(self.error_message)
             # successful, return user and token tuple
-            return token.user, token
+            return result
+
+    def get_validation_strategy(self):
+        try:
+            strategy = VALIDATION_STRATEGIES[settings.AUTH_TOKEN_VALIDATION]
+        except KeyError:
+            raise ImproperlyConfigured(
+                f"unknown AUTH_TOKEN_VALIDATION '{settings.AUTH_TOKEN_VALIDATION}'"
+            )
+        # caching strategies rely on the listener to learn about changes in other workers
+        if strategy is not validate_strict and settings.AUTH_CACHE_CHANNEL:
+            start_listener()
+        return strategy
 
     def extract_jwt(self, request):
         # check the auth header for a token, proceed to next auth class if no token
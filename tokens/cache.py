@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.utils.timezone import now
+
+
+class LRUCache:
+    """
+        bounded in-process lru cache w/ a time to live for each entry
+
+        entries are evicted least recently used first once 'maxsize' is reached,
+        and are treated as missing after 'ttl' seconds (or an explicit deadline)
+
+        the cache is shared by the threads of a worker, access is serialized by a lock
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, deadline = entry
+                if deadline > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        if self.maxsize <= 0:
+            return
+        deadline = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, deadline)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_where(self, predicate):
+        # evict every entry where predicate(key, value) is true, this scans the cache
+        with self._lock:
+            for key in [k for k, (v, _) in self._entries.items() if predicate(k, v)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RevocationSet:
+    """
+        ids of revoked tokens that have not yet expired
+
+        the set is loaded from the database on first use and reloaded every
+        'refresh_interval' seconds, revocations made in this worker are added directly
+    """
+
+    def __init__(self, refresh_interval):
+        self.refresh_interval = refresh_interval
+        self._revoked = {}
+        self._loaded = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, token_id):
+        self.refresh_if_stale()
+        return str(token_id) in self._revoked
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def add(self, token_id, expires):
+        with self._lock:
+            self._revoked[str(token_id)] = expires
+
+    def refresh_if_stale(self):
+        loaded = self._loaded
+        if loaded is None or time.monotonic() - loaded > self.refresh_interval:
+            self.load()
+
+    def load(self):
+        from .models import Token
+        revoked = Token.objects \
+            .filter(revoked__isnull=False, expires__gt=now()) \
+            .values_list('id', 'expires')
+        current = now()
+        with self._lock:
+            # revocations received since the query started are kept, expired tokens are dropped
+            merged = {k: v for k, v in self._revoked.items() if v > current}
+            merged.update((str(token_id), expires) for token_id, expires in revoked)
+            self._revoked = merged
+            self._loaded = time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            self._revoked = {}
+            self._loaded = None
+
+
+# token id -> token w/ user, used by the 'cached' validation strategy
+token_cache = LRUCache(settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL)
+
+# user id -> user, used by the 'stateless' validation strategy
+user_cache = LRUCache(settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL)
+
+revocations = RevocationSet(settings.AUTH_REVOCATION_REFRESH_INTERVAL)
+
+
+def revoke_token(token_id, expires):
+    """
+        evict a revoked token from this worker's caches
+    """
+    revocations.add(token_id, expires)
+    token_cache.discard(str(token_id))
+
+
+def invalidate_user(user_id):
+    """
+        evict a user, and every cached token belonging to the user, from this worker's caches
+    """
+    user_id = str(user_id)
+    user_cache.discard(user_id)
+    token_cache.discard_where(lambda token_id, token: str(token.user_id) == user_id)
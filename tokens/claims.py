@@ -0,0 +1,46 @@
+from django.conf import settings
+from client.claims import compact_claims
+
+
+class UnknownAudience(ValueError):
+    pass
+
+
+def profile_keys(audience=None):
+    """
+        return the profile keys included in tokens for an audience, None includes the whole profile
+
+        tokens w/o an audience include the keys required by PROFILE_JSON_SCHEMA, when no
+        schema is set nothing describes the profile, and it's included as a whole
+    """
+    if audience is not None:
+        try:
+            return settings.JWT_AUDIENCES[audience]
+        except (KeyError, TypeError):
+            raise UnknownAudience(audience)
+    schema = settings.PROFILE_JSON_SCHEMA
+    if schema is None:
+        return None
+    return schema.get('required', [])
+
+
+def project_profile(profile, audience=None):
+    """
+        return the part of a profile included in tokens for an audience
+    """
+    keys = profile_keys(audience)
+    if keys is None:
+        return profile
+    return {key: profile[key] for key in keys if key in profile}
+
+
+def token_claims(payload, issued, compact=None):
+    """
+        return the claims encoded in an access token, in the compact format when
+        JWT_COMPACT_CLAIMS is set (or 'compact' is given), see client.claims
+    """
+    if compact is None:
+        compact = settings.JWT_COMPACT_CLAIMS
+    if not compact:
+        return payload
+    return compact_claims(payload, settings.JWT_ISSUER, int(issued.timestamp()))
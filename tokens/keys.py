@@ -0,0 +1,169 @@
+import base64
+import glob
+import hashlib
+import logging
+import signal
+from collections import namedtuple
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from django.conf import settings
+from client.algorithms import algorithm_for_key, jwk_from_key
+
+
+logger = logging.getLogger(__name__)
+
+
+Key = namedtuple('Key', ('kid', 'algorithm', 'key'))
+
+KeySet = namedtuple('KeySet', ('signing', 'verification', 'jwks'))
+
+
+def key_id(public_key):
+    """
+        derive a stable 'kid' value from a public key
+        the kid is a truncated sha256 of the DER encoded public key info
+        every worker derives the same kid for the same key without configuration
+    """
+    der = public_key.public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+    digest = hashlib.sha256(der).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip('=')[:16]
+
+
+def read_key_files(private_key_file, public_key_file, verification_key_files):
+    """
+        read the pem encoded jwt keys from disk
+        'verification_key_files' is a glob pattern for additional public keys
+        return a tuple of private pem, public pem, list of verification pems
+    """
+    with open(private_key_file, 'r') as f:
+        private_pem = f.read()
+    with open(public_key_file, 'r') as f:
+        public_pem = f.read()
+    verification_pems = []
+    for path in sorted(glob.glob(verification_key_files)):
+        with open(path, 'r') as f:
+            verification_pems.append(f.read())
+    return private_pem, public_pem, verification_pems
+
+
+class KeyManager:
+    """
+        holds the parsed jwt signing and verification keys for the process
+
+        the pem strings loaded by settings.setup() are parsed once on first use
+        tokens are signed with the private key and a 'kid' header identifying it
+
+        verification keys are indexed by kid, this includes the current public key
+        and any additional keys (retired or upcoming) so keys can rotate w/o downtime
+
+        the algorithm for each key is selected by its type (RSA, P-256, Ed25519)
+        JWT_ALGORITHM can be set to require that the signing key matches an algorithm
+
+        reload() re-reads the key files, it is triggered by a signal to each worker
+    """
+
+    def __init__(self):
+        self._keyset = None
+
+    @property
+    def keyset(self):
+        # the keyset is swapped as a whole, so readers never see a partial update
+        keyset = self._keyset
+        if keyset is None:
+            keyset = self._keyset = self.parse(
+                settings.JWT_PRIVATE_KEY,
+                settings.JWT_PUBLIC_KEY,
+                settings.JWT_VERIFICATION_KEYS,
+            )
+        return keyset
+
+    @property
+    def signing_key(self):
+        return self.keyset.signing
+
+    def verification_key(self, kid=None):
+        """
+            return the verification key for a kid, or None when the kid is unknown
+            tokens issued without a kid header are verified w/ the current public key
+        """
+        keyset = self.keyset
+        if kid is None:
+            return keyset.verification.get(keyset.signing.kid)
+        if not isinstance(kid, str):
+            return None
+        return keyset.verification.get(kid)
+
+    @property
+    def verification_keys(self):
+        return list(self.keyset.verification.values())
+
+    @property
+    def jwks(self):
+        return self.keyset.jwks
+
+    def parse(self, private_pem, public_pem, verification_pems=()):
+        backend = default_backend()
+        private_key = serialization.load_pem_private_key(
+            private_pem.encode(), password=None, backend=backend
+        )
+        algorithm = algorithm_for_key(private_key)
+        if settings.JWT_ALGORITHM and settings.JWT_ALGORITHM != algorithm:
+            raise ValueError(
+                f"the jwt private key is used with {algorithm}, not {settings.JWT_ALGORITHM}"
+            )
+        signing = Key(key_id(private_key.public_key()), algorithm, private_key)
+        verification = {}
+        for pem in [public_pem, *verification_pems]:
+            public_key = serialization.load_pem_public_key(pem.encode(), backend=backend)
+            kid = key_id(public_key)
+            verification[kid] = Key(kid, algorithm_for_key(public_key), public_key)
+        if signing.kid not in verification:
+            raise ValueError('the jwt public key does not match the private key')
+        # the jwks document published to other services is built once per keyset
+        jwks = {'keys': [jwk_from_key(key.key, key.kid) for key in verification.values()]}
+        return KeySet(signing, verification, jwks)
+
+    def reload(self):
+        """
+            re-read the key files and swap in the new keyset
+            the current keyset stays in use if the files can't be read or parsed
+        """
+        try:
+            private_pem, public_pem, verification_pems = read_key_files(
+                settings.JWT_PRIVATE_KEY_FILE,
+                settings.JWT_PUBLIC_KEY_FILE,
+                settings.JWT_VERIFICATION_KEY_FILES,
+            )
+            self._keyset = self.parse(private_pem, public_pem, verification_pems)
+        except (OSError, ValueError, TypeError):
+            logger.exception('unable to reload jwt keys, the current keys remain in use')
+            return False
+        # keep the settings in sync for code that reads the pem strings directly
+        settings.JWT_PRIVATE_KEY = private_pem
+        settings.JWT_PUBLIC_KEY = public_pem
+        settings.JWT_VERIFICATION_KEYS = verification_pems
+        logger.info('reloaded jwt keys, signing with kid %s', self._keyset.signing.kid)
+        return True
+
+
+keys = KeyManager()
+
+
+def install_reload_handler():
+    """
+        reload the jwt keys when the worker receives JWT_KEY_RELOAD_SIGNAL
+
+        with gunicorn, send the signal to the worker processes rather than the master,
+        the master restarts its workers on SIGHUP, which is what we're trying to avoid
+    """
+    signal_name = settings.JWT_KEY_RELOAD_SIGNAL
+    if not signal_name:
+        return
+    try:
+        signal.signal(getattr(signal, signal_name), lambda signum, frame: keys.reload())
+    except ValueError:
+        # signal handlers can only be installed from the main thread of the process
+        logger.warning('unable to install jwt key reload handler for %s', signal_name)
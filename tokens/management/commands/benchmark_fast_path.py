@@ -0,0 +1,80 @@
+import json
+import time
+from django.core import signals
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import close_old_connections, transaction
+from django.test import RequestFactory
+from core.fast import FastPathWSGI
+from tokens.models import Token
+from users.models import User
+
+
+def call_wsgi(application, method, path, body=b'', content_type='application/json'):
+    """
+        call a wsgi application in process, return the status, headers, and body
+        used to compare the fast path w/ django
+    """
+    environ = RequestFactory().generic(method, path, body, content_type).environ
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response.update(status=int(status.split()[0]), headers=headers)
+
+    content = b''.join(application(environ, start_response))
+    return response['status'], sorted(response['headers']), content
+
+
+def requests_per_second(application, request, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call_wsgi(application, *request)
+    return iterations / (time.perf_counter() - start)
+
+
+class Command(BaseCommand):
+    """
+        compare the throughput of /status/ and /token/inspect/ through django and DRF
+        w/ the fast path in core.fast, and check that the responses are identical
+
+        requests are made in process (no server or network), so the results are the
+        per request overhead of each stack on a single core, a user and token are
+        created for the benchmark and rolled back when it completes
+    """
+
+    help = 'benchmark the fast path for /status/ and /token/inspect/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        django_application = get_wsgi_application()
+        fast_application = FastPathWSGI(django_application)
+        # requests share one transaction, as in the test client connections aren't closed
+        signals.request_started.disconnect(close_old_connections)
+        signals.request_finished.disconnect(close_old_connections)
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user('benchmark@example.com', 'benchmark1234')
+                token = Token.generate(RequestFactory().get('/'), user)
+                requests = {
+                    'status': ('GET', '/status/'),
+                    'inspect': ('POST', '/token/inspect/', json.dumps({
+                        'token': token.encode_payload(),
+                    })),
+                    'inspect invalid': ('POST', '/token/inspect/', json.dumps({
+                        'token': 'invalid',
+                    })),
+                }
+                self.stdout.write(f"{'request':<18}{'django/s':>12}{'fast/s':>12}{'speedup':>10}")
+                for name, request in requests.items():
+                    if call_wsgi(fast_application, *request) != call_wsgi(django_application, *request):
+                        self.stderr.write(f'{name} responses differ')
+                    slow = requests_per_second(django_application, request, iterations)
+                    fast = requests_per_second(fast_application, request, iterations)
+                    self.stdout.write(f'{name:<18}{slow:>12.0f}{fast:>12.0f}{fast / slow:>9.1f}x')
+                transaction.set_rollback(True)
+        finally:
+            signals.request_started.connect(close_old_connections)
+            signals.request_finished.connect(close_old_connections)
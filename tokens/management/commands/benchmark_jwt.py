@@ -0,0 +1,60 @@
+import time
+import uuid
+import jwt
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from django.core.management.base import BaseCommand
+from client.algorithms import ALGORITHMS
+
+
+def generate_key(algorithm):
+    if algorithm == 'RS256':
+        return rsa.generate_private_key(65537, 2048, default_backend())
+    if algorithm == 'ES256':
+        return ec.generate_private_key(ec.SECP256R1(), default_backend())
+    if algorithm == 'EdDSA':
+        return ed25519.Ed25519PrivateKey.generate()
+    raise ValueError(f"unsupported algorithm '{algorithm}'")
+
+
+def operations_per_second(operation, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        operation()
+    return iterations / (time.perf_counter() - start)
+
+
+class Command(BaseCommand):
+    """
+        compare jwt sign and verify throughput for each supported algorithm
+
+        payloads are shaped like an access token w/ a small profile
+        results are single core operations per second on this host
+    """
+
+    help = 'benchmark jwt sign and verify throughput per algorithm'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        payload = {
+            'token': str(uuid.uuid4()),
+            'expires': int(time.time()) + 3600,
+            'user': str(uuid.uuid4()),
+            'profile': {'name': 'Test User', 'hometown': 'Miami, Florida'},
+            'staff': False,
+        }
+        self.stdout.write(f"{'algorithm':<10}{'sign/s':>12}{'verify/s':>12}{'bytes':>8}")
+        for algorithm in ALGORITHMS:
+            private_key = generate_key(algorithm)
+            public_key = private_key.public_key()
+            token = jwt.encode(payload, private_key, algorithm=algorithm)
+            sign = operations_per_second(
+                lambda: jwt.encode(payload, private_key, algorithm=algorithm), iterations
+            )
+            verify = operations_per_second(
+                lambda: jwt.decode(token, public_key, algorithms=[algorithm]), iterations
+            )
+            self.stdout.write(f'{algorithm:<10}{sign:>12.0f}{verify:>12.0f}{len(token):>8}')
@@ -0,0 +1,57 @@
+import statistics
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from tokens.claims import token_claims
+from tokens.models import Token
+from users.models import User
+
+
+def describe(sizes):
+    sizes = sorted(sizes)
+    p95 = sizes[min(len(sizes) - 1, int(len(sizes) * 0.95))]
+    return f'{statistics.mean(sizes):>8.0f}{p95:>8}{sizes[-1]:>8}'
+
+
+class Command(BaseCommand):
+    """
+        report the size of access tokens issued for each audience in JWT_AUDIENCES
+
+        tokens are encoded for a sample of users, sizes are bytes of the encoded jwt
+        in the long and the compact claim format, the 'full profile' row is the size
+        w/ the whole profile embedded, for comparison
+    """
+
+    help = 'report access token sizes per audience'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='number of users sampled')
+
+    def handle(self, *args, **options):
+        users = list(User.objects.order_by('-join_date')[:options['users']])
+        if not users:
+            self.stderr.write('no users to sample')
+            return
+        issued = now()
+        tokens = [
+            Token(id=uuid.uuid4(), user=user, issued=issued, expires=issued + timedelta(hours=1))
+            for user in users
+        ]
+        self.stdout.write(f'{len(tokens)} users sampled')
+        self.stdout.write(
+            f"{'':<20}{'long':^24}{'compact':^24}\n"
+            f"{'audience':<20}{'mean':>8}{'p95':>8}{'max':>8}{'mean':>8}{'p95':>8}{'max':>8}"
+        )
+        rows = [('(full profile)', lambda t: {**t.payload(), 'profile': t.user.profile})]
+        rows += [
+            (audience or '(default)', lambda t, audience=audience: t.payload(audience))
+            for audience in [None, *settings.JWT_AUDIENCES]
+        ]
+        for name, payload in rows:
+            sizes = [
+                describe([len(Token.encode(token_claims(payload(t), issued, compact))) for t in tokens])
+                for compact in (False, True)
+            ]
+            self.stdout.write(f'{name:<20}{sizes[0]}{sizes[1]}')
@@ -0,0 +1,17 @@
+# Generated by Django 3.1 on 2026-10-18 05:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tokens', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='token',
+            index=models.Index(condition=models.Q(revoked__isnull=False), fields=['expires'], name='tokens_revoked_expires_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.1 on 2026-10-18 05:44
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # the token table is large, the index is built w/o blocking writes
+    atomic = False
+
+    dependencies = [
+        ('tokens', '0002_revoked_expires_index'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='token',
+            index=models.Index(fields=['issued', 'id'], name='tokens_issued_id_idx'),
+        ),
+    ]
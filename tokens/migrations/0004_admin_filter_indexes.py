@@ -0,0 +1,55 @@
+# Generated by Django 3.1 on 2026-10-18 05:47
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    # the token table is large, the indexes are built w/o blocking writes
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tokens', '0003_keyset_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='token',
+            index=models.Index(fields=['user', 'issued'], name='tokens_user_issued_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='token',
+            index=models.Index(fields=['ip', 'issued'], name='tokens_ip_issued_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='token',
+            index=models.Index(condition=models.Q(('renewed__isnull', True), ('revoked__isnull', True)), fields=['expires'], name='tokens_active_expires_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='token',
+            index=models.Index(condition=models.Q(renewed__isnull=False), fields=['issued'], name='tokens_renewed_issued_idx'),
+        ),
+        # the foreign key's own index duplicates the leading column of tokens_user_issued_idx,
+        # which serves the user lookups and the cascade on user deletion, it's dropped once
+        # that index is built, also w/o blocking writes
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'DROP INDEX CONCURRENTLY IF EXISTS tokens_token_user_id_7bb25a61',
+                    'CREATE INDEX CONCURRENTLY IF NOT EXISTS tokens_token_user_id_7bb25a61 '
+                    'ON tokens_token (user_id)',
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='token',
+                    name='user',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+    ]
@@ -7,15 +7,40 @@ from datetime import timedelta
 from django.utils.timezone import now
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import models, IntegrityError
+from django.db import connection, models, transaction, IntegrityError
+from django.db.models.signals import post_save
+from client.claims import normalize_claims
+from .claims import project_profile, token_claims
+from .keys import keys
 
 
 ALPHABET = string.ascii_uppercase + string.ascii_lowercase + string.digits
 
 
+def generate_refresh():
+    return ''.join(random.SystemRandom().choice(ALPHABET) for _ in range(64))
+
+
+def instance_from_row(model, values):
+    """
+        build a model instance from the values of its concrete fields in a raw row
+        values are passed through the field converters, as they would be by a queryset
+    """
+    fields = model._meta.concrete_fields
+    converted = []
+    for field, value in zip(fields, values):
+        column = field.get_col(model._meta.db_table)
+        converters = connection.ops.get_db_converters(column) + column.get_db_converters(connection)
+        for converter in converters:
+            value = converter(value, column, connection)
+        converted.append(value)
+    return model.from_db(connection.alias, [f.attname for f in fields], converted)
+
+
 class Token(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    user = models.ForeignKey('users.User', related_name='+', on_delete=models.CASCADE)
+    # w/o its own index, tokens_user_issued_idx leads w/ the user
+    user = models.ForeignKey('users.User', related_name='+', on_delete=models.CASCADE, db_index=False)
     ip = models.GenericIPAddressField(null=True)
     issued = models.DateTimeField()
     expires = models.DateTimeField()
@@ -24,6 +49,31 @@ class Token(models.Model):
     renewed = models.DateTimeField(null=True)
     source = models.ForeignKey('tokens.Token', related_name='+', on_delete=models.DO_NOTHING, null=True)
 
+    class Meta:
+        indexes = [
+            # the admin token list, paginated by (issued, id)
+            models.Index(fields=['issued', 'id'], name='tokens_issued_id_idx'),
+            # admin list filters, see admin.filters
+            models.Index(fields=['user', 'issued'], name='tokens_user_issued_idx'),
+            models.Index(fields=['ip', 'issued'], name='tokens_ip_issued_idx'),
+            models.Index(
+                fields=['expires'],
+                name='tokens_active_expires_idx',
+                condition=models.Q(revoked__isnull=True, renewed__isnull=True),
+            ),
+            models.Index(
+                fields=['issued'],
+                name='tokens_renewed_issued_idx',
+                condition=models.Q(renewed__isnull=False),
+            ),
+            # revoked tokens that have not yet expired, for the revocation feed
+            models.Index(
+                fields=['expires'],
+                name='tokens_revoked_expires_idx',
+                condition=models.Q(revoked__isnull=False),
+            ),
+        ]
+
     def __str__(self):
         return str(self.id)
 
@@ -41,21 +91,37 @@ class Token(models.Model):
             return False
         return True
 
-    def encode_payload(self):
+    def payload(self, audience=None):
+        """
+            claims of the jwt access token, only the profile keys of the audience's
+            claim set are included, tokens for an audience include it as 'aud'
+        """
         payload = {
             'token': str(self.id),
             'expires': int(self.expires.strftime('%s')),
             'user': str(self.user.id),
-            'profile': self.user.profile,
+            'profile': project_profile(self.user.profile, audience),
             'staff': self.user.is_staff,
         }
-        encoded = jwt.encode(payload, settings.JWT_PRIVATE_KEY, algorithm='RS256')
+        if audience is not None:
+            payload['aud'] = audience
+        return payload
+
+    @staticmethod
+    def encode(payload):
+        signing = keys.signing_key
+        encoded = jwt.encode(
+            payload, signing.key, algorithm=signing.algorithm, headers={'kid': signing.kid}
+        )
         return encoded.decode()
 
-    def auth_response(self):
+    def encode_payload(self, audience=None):
+        return self.encode(token_claims(self.payload(audience), self.issued))
+
+    def auth_response(self, audience=None):
         return {
             'user': str(self.user.id),
-            'token': self.encode_payload(),
+            'token': self.encode_payload(audience),
             'expires': int(self.expires.strftime('%s')),
             'refresh': self.refresh,
         }
@@ -63,23 +129,38 @@ class Token(models.Model):
     @classmethod
     def decode_payload(cls, token):
         try:
-            return jwt.decode(token, settings.JWT_PUBLIC_KEY, algorithms=['RS256'])
-        except jwt.exceptions.InvalidTokenError:
-            return None
+            # select the verification key by the kid header, unknown keys are invalid
+            header = jwt.get_unverified_header(token)
+            verification = keys.verification_key(header.get('kid'))
+            if verification:
+                # tokens for any audience are accepted by this service
+                claims = jwt.decode(
+                    token,
+                    verification.key,
+                    algorithms=[verification.algorithm],
+                    # expiry is checked by the caller, as for tokens in the long format
+                    options={'verify_aud': False, 'verify_exp': False},
+                )
+                return normalize_claims(claims)
+        except (jwt.exceptions.InvalidTokenError, KeyError, TypeError, ValueError):
+            pass
+        return None
 
     @classmethod
-    def decode_and_lookup(cls, token):
+    def lookup(cls, payload):
         try:
-            payload = cls.decode_payload(token)
             return cls.objects.select_related('user').get(id=payload['token'])
-        except (KeyError, TypeError, ObjectDoesNotExist):
+        except (KeyError, TypeError, ValueError, ObjectDoesNotExist):
             pass
         return None
 
+    @classmethod
+    def decode_and_lookup(cls, token):
+        return cls.lookup(cls.decode_payload(token))
+
     @classmethod
     def generate(cls, request, user, source=None):
         try:
-            refresh = ''.join(random.SystemRandom().choice(ALPHABET) for _ in range(64))
             issued = now()
             expires = issued + timedelta(seconds=settings.AUTH_TOKEN_EXPIRE_TIME)
             ip, _ = get_client_ip(request)
@@ -88,19 +169,75 @@ class Token(models.Model):
                 issued=issued,
                 expires=expires,
                 ip=ip,
-                refresh=refresh,
+                refresh=generate_refresh(),
                 source=source,
             )
         except IntegrityError:
-            return cls.generate(request, user)
+            return cls.generate(request, user, source)
+
+    @classmethod
+    def renew_sql(cls):
+        """
+            mark the token for a refresh token as renewed, insert its replacement, and
+            return the renewed token and its user, all in one statement
+
+            the update only matches a token that is neither renewed nor revoked, so
+            concurrent renewals of one refresh token wait on the row lock, and only the
+            first can match, the others find it renewed and return no row
+        """
+        user_model = cls._meta.get_field('user').related_model
+        qn = connection.ops.quote_name
+        token_table, user_table = qn(cls._meta.db_table), qn(user_model._meta.db_table)
+        source_columns = [qn(f.column) for f in cls._meta.concrete_fields]
+        user_columns = [f'{user_table}.{qn(f.column)}' for f in user_model._meta.concrete_fields]
+        return f'''
+            WITH source AS (
+                UPDATE {token_table} SET "renewed" = %s
+                WHERE "refresh" = %s AND "renewed" IS NULL AND "revoked" IS NULL
+                RETURNING {', '.join(source_columns)}
+            ), issued AS (
+                INSERT INTO {token_table} ("id", "user_id", "ip", "issued", "expires", "refresh", "source_id")
+                SELECT %s, "user_id", %s, %s, %s, %s, "id" FROM source
+            )
+            SELECT {', '.join(f'source.{c}' for c in source_columns)}, {', '.join(user_columns)}
+            FROM source JOIN {user_table} ON {user_table}."id" = source."user_id"
+        '''
 
     @classmethod
     def renew(cls, request, refresh):
+        """
+            exchange a refresh token for a new token, a refresh token can only be used once
+            return the new token, or None if the refresh token is unknown, revoked, or renewed
+        """
+        issued = now()
+        ip, _ = get_client_ip(request)
+        token = cls(
+            ip=ip,
+            issued=issued,
+            expires=issued + timedelta(seconds=settings.AUTH_TOKEN_EXPIRE_TIME),
+            refresh=generate_refresh(),
+        )
         try:
-            token = cls.objects.select_related('user').get(refresh=refresh)
-            if token.revoked is None and token.renewed is None:
-                token.renewed = now()
-                token.save()
-                return cls.generate(request, token.user, token)
-        except ObjectDoesNotExist:
-            pass
+            # a savepoint, so a collision of refresh tokens doesn't abort an outer transaction
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(cls.renew_sql(), [
+                    issued, refresh, token.id, ip, token.issued, token.expires, token.refresh,
+                ])
+                row = cursor.fetchone()
+        except IntegrityError:
+            # the new refresh token collided with an existing one, nothing was renewed
+            return cls.renew(request, refresh)
+        if row is None:
+            return None
+        # the row holds the renewed token followed by its user
+        count = len(cls._meta.concrete_fields)
+        source = instance_from_row(cls, row[:count])
+        source.user = instance_from_row(cls._meta.get_field('user').related_model, row[count:])
+        token.user, token.source = source.user, source
+        token._state.adding, token._state.db = False, connection.alias
+        # the renewed token was updated w/o save(), cache invalidation relies on the signal
+        post_save.send(
+            sender=cls, instance=source, created=False, update_fields=frozenset({'renewed'}),
+            raw=False, using=connection.alias,
+        )
+        return token
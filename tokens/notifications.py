@@ -0,0 +1,144 @@
+import logging
+import os
+import select
+import threading
+import time
+from datetime import datetime, timezone
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from django.conf import settings
+from django.db import connection, connections
+from .cache import token_cache, user_cache, revocations, revoke_token, invalidate_user
+
+
+logger = logging.getLogger(__name__)
+
+
+def publish(event, *values):
+    """
+        publish a cache invalidation event to every worker listening on AUTH_CACHE_CHANNEL
+
+        the notification is sent with the current transaction, so workers only
+        receive it once the change it describes has been committed
+    """
+    payload = ':'.join([event, *(str(value) for value in values)])
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [settings.AUTH_CACHE_CHANNEL, payload])
+
+
+def publish_revoke(token):
+    publish('revoke', token.id, int(token.expires.timestamp()))
+
+
+def publish_user(user):
+    publish('user', user.id)
+
+
+def dispatch(payload):
+    """
+        apply a cache invalidation event received from the channel to this worker's caches
+    """
+    event, _, value = payload.partition(':')
+    if event == 'revoke':
+        token_id, _, expires = value.partition(':')
+        revoke_token(token_id, datetime.fromtimestamp(int(expires), tz=timezone.utc))
+    elif event == 'user':
+        invalidate_user(value)
+    else:
+        logger.warning('ignoring unknown cache notification %r', payload)
+
+
+class Listener(threading.Thread):
+    """
+        background thread that listens for cache invalidation events on AUTH_CACHE_CHANNEL
+
+        the listener holds its own connection to postgres, when the connection is lost
+        it reconnects with backoff and clears the local caches, since events may have
+        been missed while it was disconnected
+    """
+
+    daemon = True
+
+    poll_timeout = 30
+
+    def __init__(self):
+        super().__init__(name='auth-cache-listener')
+
+    def run(self):
+        # the thread is never restarted, any error reconnects, w/ backoff reset by listen()
+        self.backoff = 1
+        while True:
+            try:
+                self.listen()
+            except (psycopg2.Error, OSError):
+                logger.exception('cache notification listener disconnected')
+            except Exception:
+                logger.exception('cache notification listener failed')
+            time.sleep(self.backoff)
+            self.backoff = min(self.backoff * 2, 60)
+
+    def connect(self):
+        params = connections['default'].get_connection_params()
+        # LISTEN holds a session, connect to the database directly when behind a pooler
+        if settings.POSTGRES_DIRECT_HOST:
+            params['host'] = settings.POSTGRES_DIRECT_HOST
+        if settings.POSTGRES_DIRECT_PORT:
+            params['port'] = settings.POSTGRES_DIRECT_PORT
+        conn = psycopg2.connect(**params)
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL('LISTEN {}').format(sql.Identifier(settings.AUTH_CACHE_CHANNEL)))
+        return conn
+
+    def listen(self):
+        conn = self.connect()
+        self.backoff = 1
+        try:
+            clear_caches()
+            while True:
+                readable, _, _ = select.select([conn], [], [], self.poll_timeout)
+                if not readable:
+                    # check the connection is still alive while the channel is quiet
+                    with conn.cursor() as cursor:
+                        cursor.execute('SELECT 1')
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    self.handle(conn.notifies.pop(0).payload)
+        finally:
+            conn.close()
+
+    def handle(self, payload):
+        try:
+            dispatch(payload)
+        except (ValueError, OverflowError):
+            logger.warning('ignoring malformed cache notification %r', payload)
+        except Exception:
+            logger.exception('failed to apply cache notification %r', payload)
+
+
+def clear_caches():
+    token_cache.clear()
+    user_cache.clear()
+    revocations.clear()
+
+
+_listener = None
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def start_listener():
+    """
+        start the listener thread for this worker process, it is safe to call repeatedly
+        threads don't survive a fork, so the listener is started again in a forked worker
+    """
+    global _listener, _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid != os.getpid():
+            _listener = Listener()
+            _listener.start()
+            _listener_pid = os.getpid()
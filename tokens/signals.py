@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .cache import revoke_token, invalidate_user, token_cache
+from .models import Token
+from .notifications import publish_revoke, publish_user
+
+
+def notifications_enabled():
+    # other workers only cache tokens and users when a caching strategy is used
+    return settings.AUTH_CACHE_CHANNEL and settings.AUTH_TOKEN_VALIDATION != 'strict'
+
+
+@receiver(post_save, sender=Token)
+def token_saved(sender, instance, **kwargs):
+    # revoked tokens are rejected immediately by the cached validation strategies
+    if instance.revoked is not None:
+        revoke_token(instance.id, instance.expires)
+        if notifications_enabled():
+            publish_revoke(instance)
+    else:
+        token_cache.discard(str(instance.id))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # recording a login doesn't change anything a cached user is used for
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    invalidate_user(instance.id)
+    if notifications_enabled():
+        publish_user(instance)
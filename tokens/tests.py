@@ -1,7 +1,25 @@
+import json
 import unittest
+from unittest import mock
+import jwt
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+from django.conf import settings
+from django.core import signals
+from django.core.wsgi import get_wsgi_application
+from django.db import DatabaseError, close_old_connections
+from django.test import override_settings
 from rest_framework import status
 from rest_framework.test import APITestCase
+from core.fast import FastPathWSGI
+from users import hashing
 from users.models import User
+from .cache import token_cache, user_cache, revocations
+from .management.commands.benchmark_fast_path import call_wsgi
+from .keys import keys
+from .models import Token
+from .notifications import Listener, dispatch
 
 
 class LoginViewTest(APITestCase):
@@ -27,6 +45,60 @@ class LoginViewTest(APITestCase):
             .post('/token/login/', self.invalid_login_request, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_login_fails_fast_when_hashing_is_busy(self):
+        # a pool w/ its only slot taken, as during a login storm
+        busy_pool = hashing.HashingPool(workers=1, queue_size=0)
+        busy_pool._slots.acquire()
+        hashing._pool, pool = busy_pool, hashing._pool
+        try:
+            response = self.client \
+                .post('/token/login/', self.valid_login_request, format='json')
+        finally:
+            hashing._pool = pool
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], str(settings.PASSWORD_HASHING_RETRY_AFTER))
+        # rejections are exposed as a metric
+        self.assertEqual(busy_pool.rejected, 1)
+        response = self.client.get('/status/metrics/')
+        self.assertIn('password_hashing_queue_depth', response.json())
+
+
+@override_settings(
+    JWT_AUDIENCES={'billing': ['plan']},
+    PROFILE_JSON_SCHEMA={'type': 'object', 'required': ['name']},
+)
+class AudienceTest(APITestCase):
+
+    def setUp(self):
+        self.valid_login_request = {
+            'email': 'test@example.com',
+            'password': 'password1234',
+        }
+        self.test_user = User.objects.create_user(**self.valid_login_request)
+        self.test_user.profile = {'name': 'Test User', 'plan': 'pro', 'bio': 'x' * 200}
+        self.test_user.save()
+
+    def login(self, **extra):
+        response = self.client \
+            .post('/token/login/', {**self.valid_login_request, **extra}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return Token.decode_payload(response.json()['token'])
+
+    def test_default_claims_include_required_keys(self):
+        payload = self.login()
+        self.assertEqual(payload['profile'], {'name': 'Test User'})
+        self.assertNotIn('aud', payload)
+
+    def test_audience_claims(self):
+        payload = self.login(audience='billing')
+        self.assertEqual(payload['profile'], {'plan': 'pro'})
+        self.assertEqual(payload['aud'], 'billing')
+
+    def test_unknown_audience_is_rejected(self):
+        response = self.client \
+            .post('/token/login/', {**self.valid_login_request, 'audience': 'x'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class RefreshViewTest(APITestCase):
 
@@ -49,6 +121,27 @@ class RefreshViewTest(APITestCase):
             .post('/token/refresh/', refresh_request, format='json')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
+    def test_refresh_is_single_use(self):
+        # login to get a token
+        response = self.client \
+            .post('/token/login/', self.valid_login_request, format='json')
+        token = response.json()
+        refresh_request = { 'refresh': token['refresh'] }
+        # the first refresh renews the token, and links the new token to it
+        with self.assertNumQueries(3):
+            response = self.client \
+                .post('/token/refresh/', refresh_request, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        renewed = Token.objects.get(refresh=token['refresh'])
+        self.assertIsNotNone(renewed.renewed)
+        issued = Token.objects.get(refresh=response.json()['refresh'])
+        self.assertEqual(issued.source_id, renewed.id)
+        self.assertEqual(issued.user_id, self.test_user.id)
+        # the same refresh token can't be used again
+        response = self.client \
+            .post('/token/refresh/', refresh_request, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_invalid_refresh(self):
         # login to get a token
         response = self.client \
@@ -117,3 +210,310 @@ class InspectViewTest(APITestCase):
             .post('/token/inspect/', inspect_request, format='json')
         self.assertEqual(inspect_response.status_code, status.HTTP_200_OK)
         self.assertTrue('valid' in inspect_response.json())
+
+    def test_batch_inspect(self):
+        tokens = []
+        for _ in range(3):
+            login_response = self.client \
+                .post('/token/login/', self.valid_login_request, format='json')
+            tokens.append(login_response.json())
+        # revoke the second token
+        self.client.post('/token/revoke/', {'refresh': tokens[1]['refresh']}, format='json')
+        inspect_request = {
+            'tokens': [tokens[0]['token'], tokens[1]['token'], 'invalid', tokens[2]['token']],
+        }
+        # the tokens are looked up w/ a single query
+        with self.assertNumQueries(1):
+            inspect_response = self.client \
+                .post('/token/inspect/batch/', inspect_request, format='json')
+        self.assertEqual(inspect_response.status_code, status.HTTP_200_OK)
+        statuses = inspect_response.json()['tokens']
+        self.assertEqual([s['valid'] for s in statuses], [True, False, False, True])
+        self.assertEqual(statuses[0]['expires'], tokens[0]['expires'])
+        self.assertLessEqual(statuses[0]['max_age'], settings.INSPECT_MAX_AGE)
+        self.assertEqual(
+            inspect_response['Cache-Control'], f"private, max-age={statuses[0]['max_age']}"
+        )
+
+    def test_batch_inspect_requires_list(self):
+        inspect_response = self.client \
+            .post('/token/inspect/batch/', {'tokens': 'invalid'}, format='json')
+        self.assertEqual(inspect_response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FastPathTest(APITestCase):
+
+    def setUp(self):
+        self.valid_login_request = {
+            'email': 'test@example.com',
+            'password': 'password1234',
+        }
+        User.objects.create_user(**self.valid_login_request)
+        self.auth = self.client \
+            .post('/token/login/', self.valid_login_request, format='json').json()
+        self.django_application = get_wsgi_application()
+        self.fast_application = FastPathWSGI(self.django_application)
+        # keep the test transaction open across requests, as the test client does
+        for signal in (signals.request_started, signals.request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+
+    def assertSameResponse(self, *request):
+        response = call_wsgi(self.fast_application, *request)
+        self.assertEqual(response, call_wsgi(self.django_application, *request))
+        return response
+
+    def test_status(self):
+        with self.assertNumQueries(0):
+            status_code, _, content = self.assertSameResponse('GET', '/status/')
+        self.assertEqual((status_code, content), (200, b''))
+
+    def test_inspect(self):
+        inspect_request = ('POST', '/token/inspect/', json.dumps({'token': self.auth['token']}))
+        with self.assertNumQueries(1):
+            call_wsgi(self.fast_application, *inspect_request)
+        status_code, _, content = self.assertSameResponse(*inspect_request)
+        self.assertEqual((status_code, content), (200, b'{"valid":true}'))
+        self.client.post('/token/revoke/', {'refresh': self.auth['refresh']}, format='json')
+        status_code, _, content = self.assertSameResponse(*inspect_request)
+        self.assertEqual((status_code, content), (200, b'{"valid":false}'))
+        status_code, _, _ = self.assertSameResponse(
+            'POST', '/token/inspect/', json.dumps({'token': 'invalid'})
+        )
+        self.assertEqual(status_code, 400)
+
+    def test_falls_through(self):
+        # requests the fast path doesn't handle are answered by django
+        status_code, _, _ = self.assertSameResponse('POST', '/token/inspect/', '{', 'application/json')
+        self.assertEqual(status_code, 400)
+        status_code, _, _ = self.assertSameResponse('POST', '/token/inspect/', 'token', 'text/plain')
+        self.assertEqual(status_code, 415)
+        token = json.dumps({'token': self.auth['token']})
+        status_code, _, _ = self.assertSameResponse(
+            'POST', '/token/inspect/', token, 'application/json-patch+json'
+        )
+        self.assertEqual(status_code, 415)
+        status_code, _, content = self.assertSameResponse('POST', '/token/inspect/', '{"token": NaN}')
+        self.assertEqual(status_code, 400)
+        self.assertIn(b'JSON parse error', content)
+        status_code, _, content = self.assertSameResponse(
+            'POST', '/token/inspect/', token.encode('utf-16'), 'application/json'
+        )
+        self.assertEqual(status_code, 400)
+        status_code, _, content = self.assertSameResponse(
+            'POST', '/token/inspect/', token, 'application/json; charset=utf-8'
+        )
+        self.assertEqual((status_code, content), (200, b'{"valid":true}'))
+
+    def test_view_error_falls_through(self):
+        # an error in the fast path is handled by django, as any other request
+        errors = []
+        signals.got_request_exception.connect(errors.append)
+        self.addCleanup(signals.got_request_exception.disconnect, errors.append)
+        with mock.patch.object(Token, 'lookup', side_effect=DatabaseError), \
+                self.assertLogs('django.request', 'ERROR'):
+            status_code, _, _ = self.assertSameResponse(
+                'POST', '/token/inspect/', json.dumps({'token': self.auth['token']})
+            )
+        self.assertEqual(status_code, 500)
+        self.assertTrue(errors)
+
+
+def generate_pems(private_key=None):
+    if private_key is None:
+        private_key = rsa.generate_private_key(65537, 2048, default_backend())
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    ).decode()
+    return private_pem, public_pem
+
+
+class KeyManagerTest(APITestCase):
+
+    def setUp(self):
+        self.valid_login_request = {
+            'email': 'test@example.com',
+            'password': 'password1234',
+        }
+        self.test_user = User.objects.create_user(**self.valid_login_request)
+        self.original_keyset = keys.keyset
+
+    def tearDown(self):
+        keys._keyset = self.original_keyset
+
+    def _login(self):
+        response = self.client \
+            .post('/token/login/', self.valid_login_request, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()['token']
+
+    def test_token_has_kid_header(self):
+        token = self._login()
+        header = jwt.get_unverified_header(token)
+        self.assertEqual(header['kid'], keys.signing_key.kid)
+
+    def test_retired_key_verifies_after_rotation(self):
+        # issue a token with the current key
+        token = self._login()
+        # rotate to a new signing key, keeping the current public key for verification
+        private_pem, public_pem = generate_pems()
+        keys._keyset = keys.parse(private_pem, public_pem, [settings.JWT_PUBLIC_KEY])
+        self.assertNotEqual(keys.signing_key.kid, jwt.get_unverified_header(token)['kid'])
+        # the token signed by the retired key is still valid
+        self.assertIsNotNone(Token.decode_payload(token))
+        # and new tokens are signed with the new key
+        new_token = self._login()
+        self.assertEqual(jwt.get_unverified_header(new_token)['kid'], keys.signing_key.kid)
+        self.assertIsNotNone(Token.decode_payload(new_token))
+
+    def test_unknown_kid_is_rejected(self):
+        token = self._login()
+        # rotate to a new key without keeping the current public key
+        private_pem, public_pem = generate_pems()
+        keys._keyset = keys.parse(private_pem, public_pem)
+        self.assertIsNone(Token.decode_payload(token))
+
+    def test_jwks_publishes_verification_keys(self):
+        response = self.client.get('/.well-known/jwks.json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue('max-age' in response['Cache-Control'])
+        kids = [jwk['kid'] for jwk in response.json()['keys']]
+        self.assertTrue(keys.signing_key.kid in kids)
+
+    def test_signing_algorithm_selected_by_key_type(self):
+        generated_keys = {
+            'ES256': ec.generate_private_key(ec.SECP256R1(), default_backend()),
+            'EdDSA': ed25519.Ed25519PrivateKey.generate(),
+        }
+        for algorithm, private_key in generated_keys.items():
+            private_pem, public_pem = generate_pems(private_key)
+            keys._keyset = keys.parse(private_pem, public_pem)
+            token = self._login()
+            self.assertEqual(jwt.get_unverified_header(token)['alg'], algorithm)
+            self.assertIsNotNone(Token.decode_payload(token))
+
+
+class ValidationStrategyTest(APITestCase):
+
+    def setUp(self):
+        self.valid_login_request = {
+            'email': 'test@example.com',
+            'password': 'password1234',
+        }
+        self.test_user = User.objects.create_user(**self.valid_login_request)
+        token_cache.clear()
+        user_cache.clear()
+        revocations.clear()
+
+    def _login(self):
+        response = self.client \
+            .post('/token/login/', self.valid_login_request, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def _assert_revoke_rejects_token(self):
+        auth = self._login()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + auth['token'])
+        response = self.client.get('/account/manage/', format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # revoke the token, the cached entry must not keep it alive
+        response = self.client \
+            .post('/token/revoke/', {'refresh': auth['refresh']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get('/account/manage/', format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(AUTH_TOKEN_VALIDATION='cached', AUTH_CACHE_CHANNEL=None)
+    def test_cached_validation_skips_database(self):
+        auth = self._login()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + auth['token'])
+        response = self.client.get('/account/manage/', format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # the token and user are cached after the first request
+        with self.assertNumQueries(0):
+            response = self.client.get('/account/manage/', format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(AUTH_TOKEN_VALIDATION='cached', AUTH_CACHE_CHANNEL=None)
+    def test_cached_validation_rejects_revoked_token(self):
+        self._assert_revoke_rejects_token()
+
+    @override_settings(AUTH_TOKEN_VALIDATION='cached', AUTH_CACHE_CHANNEL=None)
+    def test_cached_user_is_updated(self):
+        auth = self._login()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + auth['token'])
+        update_profile_request = {'profile': {'name': 'Some User'}}
+        response = self.client \
+            .post('/account/manage/', update_profile_request, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get('/account/manage/', format='json')
+        self.assertEqual(response.json()['profile'], update_profile_request['profile'])
+
+    @override_settings(AUTH_TOKEN_VALIDATION='stateless', AUTH_CACHE_CHANNEL=None)
+    def test_stateless_validation_skips_token_lookup(self):
+        auth = self._login()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + auth['token'])
+        response = self.client.get('/account/manage/', format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            response = self.client.get('/account/manage/', format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(AUTH_TOKEN_VALIDATION='stateless', AUTH_CACHE_CHANNEL=None)
+    def test_stateless_validation_rejects_revoked_token(self):
+        self._assert_revoke_rejects_token()
+
+
+class CacheNotificationTest(APITestCase):
+
+    def setUp(self):
+        self.valid_login_request = {
+            'email': 'test@example.com',
+            'password': 'password1234',
+        }
+        self.test_user = User.objects.create_user(**self.valid_login_request)
+        token_cache.clear()
+        user_cache.clear()
+        revocations.clear()
+
+    def _cache_token(self):
+        response = self.client \
+            .post('/token/login/', self.valid_login_request, format='json')
+        token = Token.decode_and_lookup(response.json()['token'])
+        token_cache.set(str(token.id), token)
+        user_cache.set(str(self.test_user.id), self.test_user)
+        return token
+
+    def test_revoke_notification_evicts_token(self):
+        token = self._cache_token()
+        dispatch(f'revoke:{token.id}:{int(token.expires.timestamp())}')
+        self.assertIsNone(token_cache.get(str(token.id)))
+        self.assertTrue(str(token.id) in revocations)
+
+    def test_user_notification_evicts_user_and_tokens(self):
+        token = self._cache_token()
+        dispatch(f'user:{self.test_user.id}')
+        self.assertIsNone(token_cache.get(str(token.id)))
+        self.assertIsNone(user_cache.get(str(self.test_user.id)))
+
+    def test_malformed_notification_is_ignored(self):
+        token = self._cache_token()
+        with self.assertLogs('tokens.notifications', 'WARNING'):
+            Listener().handle(f'revoke:{token.id}:99999999999999999999')
+        self.assertIsNotNone(token_cache.get(str(token.id)))
+
+    def test_listener_survives_errors(self):
+        # an unexpected error reconnects instead of ending the thread
+        listener = Listener()
+        with mock.patch.object(listener, 'listen', side_effect=RuntimeError) as listen, \
+                mock.patch('tokens.notifications.time.sleep', side_effect=[None, KeyboardInterrupt]), \
+                self.assertLogs('tokens.notifications', 'ERROR'):
+            with self.assertRaises(KeyboardInterrupt):
+                listener.run()
+        self.assertEqual(listen.call_count, 2)
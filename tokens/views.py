@@ -1,30 +1,52 @@
+import uuid
+from datetime import datetime, timedelta, timezone
 from django.conf import settings
 from django.utils.timezone import now
 from django.contrib.auth import authenticate
 from rest_framework.views import APIView
 from rest_framework.status import HTTP_200_OK, HTTP_401_UNAUTHORIZED, HTTP_400_BAD_REQUEST
 from rest_framework.response import Response
+from client.revocation import BloomFilter, encode_ids
+from throttling.throttles import LoginIPThrottle, LoginEmailThrottle
+from .claims import profile_keys, UnknownAudience
+from .keys import keys
 from .models import Token
 
 
+def requested_audience(request):
+    """
+        return the 'audience' of a login or refresh request, or raise UnknownAudience
+    """
+    audience = request.data.get('audience')
+    if audience is not None:
+        profile_keys(audience)
+    return audience
+
+
 class LoginView(APIView):
     """
         api for login / issue token
 
         provide an email address + password to receive an auth tokenset
+        provide an optional 'audience' to receive a token w/ that audience's claim set
     """
 
     authentication_classes = ()
     permission_classes = ()
+    throttle_classes = (LoginIPThrottle, LoginEmailThrottle)
 
     def post(self, request, *args, **kwargs):
+        try:
+            audience = requested_audience(request)
+        except UnknownAudience:
+            return Response({'error': 'invalid audience'}, status=HTTP_400_BAD_REQUEST)
         email = request.data.get('email')
         password = request.data.get('password')
         if email and password:
             user = authenticate(email=email, password=password)
             if user is not None:
                 token = Token.generate(request, user)
-                return Response(token.auth_response(), status=HTTP_200_OK)
+                return Response(token.auth_response(audience), status=HTTP_200_OK)
         return Response({'error': 'invalid login'}, status=HTTP_400_BAD_REQUEST)
 
 
@@ -33,17 +55,22 @@ class RefreshView(APIView):
         api to refresh auth tokenset
 
         provide a refresh token to receive a renewed auth tokenset
+        provide an optional 'audience' to receive a token w/ that audience's claim set
     """
 
     authentication_classes = ()
     permission_classes = ()
 
     def post(self, request, *args, **kwargs):
+        try:
+            audience = requested_audience(request)
+        except UnknownAudience:
+            return Response({'error': 'invalid audience'}, status=HTTP_400_BAD_REQUEST)
         refresh = request.data.get('refresh')
         if refresh:
             token = Token.renew(request, refresh)
             if token:
-                return Response(token.auth_response(), status=HTTP_200_OK)
+                return Response(token.auth_response(audience), status=HTTP_200_OK)
         return Response({'error': 'invalid refresh'}, status=HTTP_400_BAD_REQUEST)
 
 
@@ -83,15 +110,138 @@ class InspectView(APIView):
     def post(self, request, *args, **kwargs):
         # parse the jwt token provided in the request body json
         if 'token' in request.data and type(request.data['token']) == str:
-            token = Token.decode_and_lookup(request.data['token'])
+            payload = Token.decode_payload(request.data['token'])
+            token = Token.lookup(payload)
             # if the token was populated from the db, return a response w/ token status
             if token:
                 response_json = {'valid': False}
                 # when DEBUG is set, also return the decoded token payload
                 if settings.DEBUG:
-                    response_json['payload'] = Token.decode_payload(request.data['token'])
+                    response_json['payload'] = payload
                 if token.is_valid:
                     response_json['valid'] = True
                 return Response(response_json, status=HTTP_200_OK)
         # when the token is not populated, return a 400 w/ error
         return Response({'error': 'invalid token'}, status=HTTP_400_BAD_REQUEST)
+
+
+class BatchInspectView(APIView):
+    """
+        api to inspect a batch of jwt access tokens, for gateways
+
+        provide 'tokens', a list of jwt access tokens, to receive the status of each
+        signatures are verified in one pass and the tokens are looked up w/ one query
+
+        each status has a 'max_age', the seconds it can be cached, valid tokens can
+        be revoked at any time so their status is cached briefly, tokens that are
+        revoked, renewed or expired never become valid again
+    """
+
+    authentication_classes = ()
+    permission_classes = ()
+
+    def post(self, request, *args, **kwargs):
+        jwts = request.data.get('tokens') if isinstance(request.data, dict) else None
+        if not isinstance(jwts, list) or not 0 < len(jwts) <= settings.INSPECT_BATCH_SIZE:
+            error_message = {'error': f'provide a list of 1 to {settings.INSPECT_BATCH_SIZE} tokens'}
+            return Response(error_message, status=HTTP_400_BAD_REQUEST)
+        # a token repeated in the batch is only verified once
+        token_ids = {}
+        for jwt in {jwt for jwt in jwts if isinstance(jwt, str)}:
+            try:
+                token_ids[jwt] = uuid.UUID(Token.decode_payload(jwt)['token'])
+            except (KeyError, TypeError, ValueError):
+                pass
+        tokens = Token.objects \
+            .filter(id__in=set(token_ids.values())) \
+            .only('id', 'expires', 'revoked', 'renewed') \
+            .in_bulk()
+        current = now()
+        statuses = []
+        for jwt in jwts:
+            token = tokens.get(token_ids.get(jwt)) if isinstance(jwt, str) else None
+            if token is not None and token.is_valid:
+                expires = int((token.expires - current).total_seconds())
+                statuses.append({
+                    'valid': True,
+                    'expires': int(token.expires.timestamp()),
+                    'max_age': max(0, min(settings.INSPECT_MAX_AGE, expires)),
+                })
+            else:
+                statuses.append({'valid': False, 'max_age': settings.INSPECT_INVALID_MAX_AGE})
+        response = Response({'tokens': statuses}, status=HTTP_200_OK)
+        # the response as a whole can be cached as long as its shortest lived status
+        max_age = min(entry['max_age'] for entry in statuses)
+        response['Cache-Control'] = f'private, max-age={max_age}'
+        return response
+
+
+class RevocationsView(APIView):
+    """
+        api to list revoked access tokens that have not yet expired
+
+        without parameters, returns a snapshot of every revoked token id
+        provide 'encoding=bloom' to receive the snapshot as a bloom filter
+        provide 'since' with the sequence from a previous response to receive only new ids
+    """
+
+    authentication_classes = ()
+    permission_classes = ()
+
+    def get(self, request, *args, **kwargs):
+        current = now()
+        # the sequence trails the current time, so revocations committed while this
+        # request runs are included again in the next delta rather than being missed
+        settled = current - timedelta(seconds=settings.REVOCATION_FEED_SETTLE_TIME)
+        sequence = int(settled.timestamp() * 1000000)
+        revoked = Token.objects.filter(revoked__isnull=False, expires__gt=current)
+        if 'since' in request.query_params:
+            try:
+                since = int(request.query_params['since'])
+                since = datetime.fromtimestamp(since / 1000000, tz=timezone.utc)
+            except (ValueError, OverflowError, OSError):
+                return Response({'error': 'invalid request'}, status=HTTP_400_BAD_REQUEST)
+            token_ids = list(revoked.filter(revoked__gte=since).values_list('id', flat=True))
+            return Response({
+                'sequence': sequence,
+                'delta': True,
+                'count': len(token_ids),
+                'ids': encode_ids(token_ids),
+            }, status=HTTP_200_OK)
+        token_ids = list(revoked.values_list('id', flat=True))
+        encoding = request.query_params.get('encoding', 'ids')
+        if encoding == 'bloom':
+            bloom = BloomFilter.for_capacity(len(token_ids), settings.REVOCATION_BLOOM_ERROR_RATE)
+            for token_id in token_ids:
+                bloom.add(token_id.bytes)
+            return Response({
+                'sequence': sequence,
+                'count': len(token_ids),
+                'bloom': bloom.to_dict(),
+            }, status=HTTP_200_OK)
+        if encoding == 'ids':
+            return Response({
+                'sequence': sequence,
+                'count': len(token_ids),
+                'ids': encode_ids(token_ids),
+            }, status=HTTP_200_OK)
+        return Response({'error': 'invalid request'}, status=HTTP_400_BAD_REQUEST)
+
+
+class JWKSView(APIView):
+    """
+        api to publish the jwt verification keys as a json web key set
+
+        services verifying tokens fetch the keys by kid, responses are cacheable
+    """
+
+    authentication_classes = ()
+    permission_classes = ()
+
+    def get(self, request, *args, **kwargs):
+        response = Response(keys.jwks, status=HTTP_200_OK)
+        response['Cache-Control'] = (
+            f'public, max-age={settings.JWKS_MAX_AGE}, '
+            f'stale-while-revalidate={settings.JWKS_STALE_WHILE_REVALIDATE}'
+        )
+        return response
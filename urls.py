@@ -10,6 +10,10 @@ urlpatterns = [
 
     # status check endpoint
     path('status/', core_views.StatusView.as_view()),
+    path('status/metrics/', core_views.MetricsView.as_view()),
+
+    # json web key set used by other services to verify tokens
+    path('.well-known/jwks.json', tokens_views.JWKSView.as_view()),
 
     # account management routes
     path('account/signup/', account_views.SignupView.as_view()),
@@ -22,6 +26,8 @@ urlpatterns = [
     path('token/refresh/', tokens_views.RefreshView.as_view()),
     path('token/revoke/', tokens_views.RevokeView.as_view()),
     path('token/inspect/', tokens_views.InspectView.as_view()),
+    path('token/inspect/batch/', tokens_views.BatchInspectView.as_view()),
+    path('token/revocations/', tokens_views.RevocationsView.as_view()),
 
     # admin management apis
     url(r'^users/', include(admin_views.user_router.urls)),
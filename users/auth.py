@@ -1,4 +1,5 @@
 from django.contrib.auth.backends import ModelBackend
+from .hashing import check_password
 from .models import User
 
 
@@ -11,8 +12,8 @@ class AuthenticationBackend(ModelBackend):
 
     def authenticate(self, request, email=None, password=None, *args, **kwargs):
         try:
-            user = User.objects.get(email__iexact=email.lower())
-            if user.is_active and user.check_password(password):
+            user = User.objects.with_email(email).get()
+            if user.is_active and check_password(user, password):
                 user.update_last_login()
                 return user
         except User.DoesNotExist:
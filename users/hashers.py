@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+        argon2 hasher w/ costs from the ARGON2_* settings
+
+        stored hashes record the costs they were made with, a hash made w/ other
+        costs is still verified, and is upgraded to the current costs after a login
+        use the 'calibrate_argon2' manage command to choose costs for a host
+    """
+
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM
@@ -0,0 +1,175 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.db import connections
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from core import metrics
+
+
+class HashingUnavailable(APIException):
+    """
+        raised when the hashing pool is full, DRF responds w/ a 503 and a Retry-After header
+    """
+
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'service busy, try again later'
+    default_code = 'hashing_unavailable'
+
+    def __init__(self, wait):
+        super().__init__()
+        self.wait = wait
+
+
+class HashingPool:
+    """
+        bounded pool of threads used to hash and verify passwords
+
+        argon2 releases the gil while hashing, so a few threads keep the cpu busy
+        w/o pinning every request thread, at most 'workers' passwords are hashed at
+        once and 'queue_size' more wait their turn, beyond that requests are rejected
+        immediately instead of queueing behind a login storm
+    """
+
+    def __init__(self, workers, queue_size):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queued = 0
+        self.active = 0
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+
+    @property
+    def executor(self):
+        # threads don't survive a fork, so a forked worker starts its own executor
+        if self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        self.workers, thread_name_prefix='password-hashing'
+                    )
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def call(self, function, *args):
+        # runs in a pool thread, counts the task as active instead of queued
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+        try:
+            return function(*args)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def run(self, function, *args):
+        """
+            run a function in the pool and wait for its result
+            raise HashingUnavailable when the pool and its queue are full
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingUnavailable(settings.PASSWORD_HASHING_RETRY_AFTER)
+        try:
+            with self._lock:
+                self.queued += 1
+            return self.executor.submit(self.call, function, *args).result()
+        finally:
+            self._slots.release()
+
+    def submit(self, function, *args):
+        """
+            run a function in the pool w/o waiting for it, for work off the request path
+            return False when the pool and its queue are full, the work is not done
+        """
+        if not self._slots.acquire(blocking=False):
+            return False
+        with self._lock:
+            self.queued += 1
+        future = self.executor.submit(self.call, function, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        return True
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HashingPool(
+                    settings.PASSWORD_HASHING_WORKERS, settings.PASSWORD_HASHING_QUEUE_SIZE
+                )
+    return _pool
+
+
+def verify_password(password, encoded):
+    """
+        check a password against an encoded hash, runs in a pool thread
+        return a tuple of the result and whether the hash was made w/ outdated settings
+    """
+    outdated = []
+    valid = hashers.check_password(password, encoded, setter=lambda _: outdated.append(True))
+    return valid, bool(outdated)
+
+
+def rehash_password(user_id, password, encoded):
+    """
+        replace an outdated hash w/ one made w/ the current settings, runs in a pool thread
+
+        the update only matches the hash that was verified, so a password changed
+        in the meantime is never overwritten
+    """
+    from .models import User
+    return User.objects \
+        .filter(id=user_id, password=encoded) \
+        .update(password=hashers.make_password(password))
+
+
+def rehash_in_background(user_id, password, encoded):
+    try:
+        rehash_password(user_id, password, encoded)
+    finally:
+        # pool threads outlive requests, so they don't keep database connections open
+        connections.close_all()
+
+
+def check_password(user, password):
+    """
+        pool version of user.check_password()
+
+        an outdated hash is upgraded in the background after the response, and left
+        for a later login when the pool is busy, so the costs can be changed either way
+    """
+    valid, outdated = get_pool().run(verify_password, password, user.password)
+    if valid and outdated:
+        get_pool().submit(rehash_in_background, user.id, password, user.password)
+    return valid
+
+
+def set_password(user, password):
+    """
+        pool version of user.set_password(), the user is not saved
+    """
+    user.password = get_pool().run(hashers.make_password, password)
+    # as set_password(), this lets save() notify the password validators of the change
+    user._password = password
+
+
+def pool_metric(attribute):
+    # metrics read the pool of this process, w/o creating it
+    return lambda: getattr(_pool, attribute, 0)
+
+
+metrics.register('password_hashing_queue_depth', pool_metric('queued'))
+metrics.register('password_hashing_active', pool_metric('active'))
+metrics.register('password_hashing_rejected', pool_metric('rejected'))
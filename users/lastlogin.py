@@ -0,0 +1,116 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from django.conf import settings
+from django.db import connection
+
+
+logger = logging.getLogger(__name__)
+
+
+class LastLoginBuffer:
+    """
+        last login times waiting to be written, coalesced by user
+
+        logins record the time in memory, a background thread writes every pending
+        time w/ one batched update each LAST_LOGIN_MAX_STALENESS seconds, and the
+        buffer is flushed when the process exits, an update never moves a last
+        login back in time, so flushes from several processes can overlap
+    """
+
+    # rows per update statement
+    batch_size = 1000
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread_pid = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record(self, user_id, timestamp):
+        with self._lock:
+            if user_id not in self._pending or self._pending[user_id] < timestamp:
+                self._pending[user_id] = timestamp
+        self.start()
+
+    def update_sql(self, rows):
+        from .models import User
+        table = connection.ops.quote_name(User._meta.db_table)
+        values = ', '.join(['(%s::uuid, %s::timestamptz)'] * rows)
+        return f'''
+            UPDATE {table} SET "last_login" = pending."last_login"
+            FROM (VALUES {values}) AS pending ("id", "last_login")
+            WHERE {table}."id" = pending."id"
+            AND ({table}."last_login" IS NULL OR {table}."last_login" < pending."last_login")
+        '''
+
+    def flush(self):
+        """
+            write the pending last login times, they are kept for the next flush on error
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        rows = sorted(pending.items())
+        try:
+            with connection.cursor() as cursor:
+                for i in range(0, len(rows), self.batch_size):
+                    batch = rows[i:i + self.batch_size]
+                    cursor.execute(
+                        self.update_sql(len(batch)),
+                        [value for row in batch for value in row],
+                    )
+        except Exception:
+            # pending times recorded since are newer, they replace the ones put back
+            with self._lock:
+                self._pending = {**pending, **self._pending}
+            raise
+
+    def run(self):
+        while True:
+            time.sleep(settings.LAST_LOGIN_MAX_STALENESS)
+            try:
+                if self._pending:
+                    self.flush()
+            except Exception:
+                logger.exception('unable to write %d last login times', len(self))
+            finally:
+                # the connection isn't needed until the next flush
+                connection.close()
+
+    def exit(self):
+        try:
+            if self._pending:
+                self.flush()
+        except Exception:
+            logger.exception('unable to write %d last login times at exit', len(self))
+
+    def start(self):
+        """
+            start flushing in a background thread, safe to call repeatedly
+            threads don't survive a fork, so flushing is started again in a forked worker
+        """
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid != os.getpid():
+                thread = threading.Thread(target=self.run, name='last-login-flush', daemon=True)
+                thread.start()
+                atexit.register(self.exit)
+                self._thread_pid = os.getpid()
+
+
+buffer = LastLoginBuffer()
+
+
+def record_login(user):
+    """
+        record a login for the user, written immediately when LAST_LOGIN_MAX_STALENESS is 0
+    """
+    if not settings.LAST_LOGIN_MAX_STALENESS:
+        user.save(update_fields=['last_login'])
+    else:
+        buffer.record(user.id, user.last_login)
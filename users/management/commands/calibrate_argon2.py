@@ -0,0 +1,107 @@
+import os
+import re
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.core.management.base import BaseCommand
+
+
+def hash_latency(time_cost, memory_cost, parallelism, concurrency, samples):
+    """
+        median latency (seconds) of a hash, while 'concurrency' hashes run at once
+        as they do when every thread of the password hashing pool is busy
+    """
+    hasher = hashers.Argon2PasswordHasher()
+    hasher.time_cost = time_cost
+    hasher.memory_cost = memory_cost
+    hasher.parallelism = parallelism
+
+    def timed_hash():
+        start = time.perf_counter()
+        hasher.encode('calibrate-argon2-password', hasher.salt())
+        return time.perf_counter() - start
+
+    latencies = []
+    with ThreadPoolExecutor(concurrency) as executor:
+        for _ in range(samples):
+            latencies.extend(executor.map(lambda _: timed_hash(), range(concurrency)))
+    return statistics.median(latencies)
+
+
+def write_env_file(path, values):
+    # replace the values in an existing env file, values not in the file are appended
+    lines = open(path).read().splitlines() if os.path.exists(path) else []
+    remaining = dict(values)
+    for i, line in enumerate(lines):
+        match = re.match(r'^(\w+)=', line)
+        if match and match.group(1) in remaining:
+            lines[i] = f'{match.group(1)}={remaining.pop(match.group(1))}'
+    lines.extend(f'{name}={value}' for name, value in remaining.items())
+    with open(path, 'w') as env_file:
+        env_file.write('\n'.join(lines) + '\n')
+
+
+class Command(BaseCommand):
+    """
+        choose argon2 costs for this host that fit a hash within a latency budget
+
+        memory cost is chosen first, as the largest power of two that fits the budget
+        w/ a single pass, then time cost is raised while the hash still fits, hashes
+        are timed w/ PASSWORD_HASHING_WORKERS running at once, as on a busy worker
+
+        parallelism defaults to the cpu cores available to each hashing thread
+    """
+
+    help = 'benchmark argon2 costs and recommend ARGON2_* settings for this host'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', type=int, default=250, help='latency budget (ms)')
+        parser.add_argument('--max-memory', type=int, default=65536, help='memory cost (KiB)')
+        parser.add_argument('--min-memory', type=int, default=4096, help='memory cost (KiB)')
+        parser.add_argument('--max-time', type=int, default=10, help='time cost (passes)')
+        parser.add_argument('--parallelism', type=int, default=None)
+        parser.add_argument('--samples', type=int, default=3)
+        parser.add_argument('--env-file', default=None, help='write the settings to this file')
+
+    def handle(self, *args, **options):
+        target = options['target'] / 1000
+        concurrency = settings.PASSWORD_HASHING_WORKERS
+        parallelism = options['parallelism'] or max(1, (os.cpu_count() or 1) // concurrency)
+
+        def measure(time_cost, memory_cost):
+            latency = hash_latency(
+                time_cost, memory_cost, parallelism, concurrency, options['samples']
+            )
+            self.stdout.write(f'{time_cost:>6}{memory_cost:>12}{latency * 1000:>12.1f}')
+            return latency
+
+        self.stdout.write(
+            f'parallelism {parallelism}, {concurrency} concurrent hashes, '
+            f"target {options['target']} ms"
+        )
+        self.stdout.write(f"{'time':>6}{'memory':>12}{'ms':>12}")
+
+        # the largest memory cost that fits the budget w/ one pass
+        memory_cost = options['max_memory']
+        while memory_cost > options['min_memory'] and measure(1, memory_cost) > target:
+            memory_cost //= 2
+        memory_cost = max(memory_cost, options['min_memory'], 8 * parallelism)
+
+        # then as many passes as still fit
+        time_cost = 1
+        while time_cost < options['max_time'] and measure(time_cost + 1, memory_cost) <= target:
+            time_cost += 1
+
+        values = {
+            'ARGON2_TIME_COST': time_cost,
+            'ARGON2_MEMORY_COST': memory_cost,
+            'ARGON2_PARALLELISM': parallelism,
+        }
+        self.stdout.write('\nrecommended settings')
+        for name, value in values.items():
+            self.stdout.write(f'{name}={value}')
+        if options['env_file']:
+            write_env_file(options['env_file'], values)
+            self.stdout.write(f"\nwritten to {options['env_file']}, restart the workers to apply")
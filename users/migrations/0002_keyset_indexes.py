@@ -0,0 +1,17 @@
+# Generated by Django 3.1 on 2026-10-18 05:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['join_date', 'id'], name='users_join_date_id_idx'),
+        ),
+    ]
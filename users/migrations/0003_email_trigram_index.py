@@ -0,0 +1,23 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # the index is built w/o blocking writes
+    atomic = False
+
+    dependencies = [
+        ('users', '0002_keyset_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # an expression index, citext has its own ILIKE operator, which gin_trgm_ops doesn't
+        # support, the admin search matches email::text, see admin.filters
+        migrations.RunSQL(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS users_email_trgm_idx '
+            'ON users_user USING gin ((email::text) gin_trgm_ops)',
+            'DROP INDEX CONCURRENTLY IF EXISTS users_email_trgm_idx',
+        ),
+    ]
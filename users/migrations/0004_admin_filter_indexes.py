@@ -0,0 +1,29 @@
+# Generated by Django 3.1 on 2026-10-18 05:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_email_trigram_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['status', 'join_date'], name='users_status_join_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(verified=False), fields=['join_date'], name='users_unverified_join_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(is_staff=True), fields=['join_date'], name='users_staff_join_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(last_login__isnull=False), fields=['last_login'], name='users_last_login_idx'),
+        ),
+    ]
@@ -4,20 +4,32 @@ from django.db import models
 from django.utils.timezone import now
 from django.contrib.postgres import fields as postgres
 from django.contrib.auth.base_user import AbstractBaseUser, BaseUserManager
+from .hashing import set_password
+from .lastlogin import record_login
+from .profile import clean_profile
 
 
 class UserManager(BaseUserManager):
 
     use_in_migrations = True
 
-    def _create_user(self, email, password):
+    def _create_user(self, email, password, profile=None):
         email = self.normalize_email(email)
-        user = self.model(email=email)
-        user.set_password(password)
+        user = self.model(email=email, profile=clean_profile(profile or {}))
+        set_password(user, password)
         return user
 
-    def create_user(self, email, password):
-        user = self._create_user(email, password)
+    def with_email(self, email):
+        """
+            case-insensitive lookup of users by email address
+
+            the email column is citext, so equality ignores case and uses its unique
+            index, unlike email__iexact, which compares UPPER() and scans the table
+        """
+        return self.filter(email=email)
+
+    def create_user(self, email, password, profile=None):
+        user = self._create_user(email, password, profile)
         user.save()
         return user
 
@@ -75,6 +87,29 @@ class User(AbstractBaseUser):
 
     objects = UserManager()
 
+    class Meta:
+        indexes = [
+            # the admin user list, paginated by (join_date, id)
+            models.Index(fields=['join_date', 'id'], name='users_join_date_id_idx'),
+            # admin list filters, see admin.filters
+            models.Index(fields=['status', 'join_date'], name='users_status_join_date_idx'),
+            models.Index(
+                fields=['join_date'],
+                name='users_unverified_join_date_idx',
+                condition=models.Q(verified=False),
+            ),
+            models.Index(
+                fields=['join_date'],
+                name='users_staff_join_date_idx',
+                condition=models.Q(is_staff=True),
+            ),
+            models.Index(
+                fields=['last_login'],
+                name='users_last_login_idx',
+                condition=models.Q(last_login__isnull=False),
+            ),
+        ]
+
     USERNAME_FIELD = 'email'
     EMAIL_FIELD = 'email'
     REQUIRED_FIELDS = []
@@ -88,8 +123,4 @@ class User(AbstractBaseUser):
 
     def update_last_login(self):
         self.last_login = now()
-        self.save(update_fields=['last_login'])
-
-    # todo: can we access profile thru a property to auto-merge it with schema
-
-    # todo: override save() method to merge with json schema
+        record_login(self)
@@ -0,0 +1,86 @@
+import copy
+import json
+import threading
+import jsonschema
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from rest_framework import serializers
+
+
+_compiled = (None, None)
+_compiled_lock = threading.Lock()
+
+
+def get_validator():
+    """
+        return a validator for PROFILE_JSON_SCHEMA, or None when no schema is set
+        the schema is checked and compiled once, and reused until the setting changes
+    """
+    global _compiled
+    schema = settings.PROFILE_JSON_SCHEMA
+    if schema is None:
+        return None
+    compiled_schema, validator = _compiled
+    if compiled_schema is not schema:
+        with _compiled_lock:
+            validator_class = jsonschema.validators.validator_for(schema)
+            validator_class.check_schema(schema)
+            validator = validator_class(schema, format_checker=jsonschema.FormatChecker())
+            _compiled = (schema, validator)
+    return validator
+
+
+def merge_defaults(schema, instance):
+    """
+        return a copy of an object w/ the defaults of the schema's properties filled in,
+        including the properties of nested objects
+    """
+    if not isinstance(instance, dict):
+        return instance
+    merged = dict(instance)
+    for name, subschema in schema.get('properties', {}).items():
+        if not isinstance(subschema, dict):
+            continue
+        if name not in merged and 'default' in subschema:
+            merged[name] = copy.deepcopy(subschema['default'])
+        if name in merged:
+            merged[name] = merge_defaults(subschema, merged[name])
+    return merged
+
+
+def clean_profile(profile):
+    """
+        merge the schema defaults into a profile, then validate it
+        return the merged profile, or raise a django ValidationError w/ a message per error,
+        it's raised from the model manager, so manage commands like 'createsuperuser' report it
+    """
+    if not isinstance(profile, dict):
+        raise ValidationError('profile must be a json object')
+    validator = get_validator()
+    if validator is not None:
+        profile = merge_defaults(validator.schema, profile)
+        errors = sorted(validator.iter_errors(profile), key=lambda e: list(e.absolute_path))
+        if errors:
+            raise ValidationError([
+                f"{'.'.join(str(p) for p in error.absolute_path) or 'profile'}: {error.message}"
+                for error in errors
+            ])
+    # the profile is embedded in every token, so its size is limited
+    size = len(json.dumps(profile, separators=(',', ':')).encode())
+    if size > settings.PROFILE_MAX_SIZE:
+        raise ValidationError(
+            f'profile is {size} bytes, the limit is {settings.PROFILE_MAX_SIZE} bytes'
+        )
+    return profile
+
+
+class ProfileField(serializers.JSONField):
+    """
+        serializer field for a user profile, validated and merged w/ PROFILE_JSON_SCHEMA
+    """
+
+    def to_internal_value(self, data):
+        try:
+            return clean_profile(super().to_internal_value(data))
+        except ValidationError as error:
+            raise serializers.ValidationError(error.messages)
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import uuid
+from unittest import mock
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from .hashing import verify_password, rehash_password
+from .lastlogin import buffer
+from .models import User
+
+
+REQUIRED_NAME_SCHEMA = {
+    'type': 'object',
+    'properties': {'name': {'type': 'string'}},
+    'required': ['name'],
+}
+
+
+class PasswordRehashTest(APITestCase):
+
+    def setUp(self):
+        self.test_user = User.objects.create_user('test@example.com', 'password1234')
+
+    def test_outdated_hash_is_upgraded(self):
+        with override_settings(ARGON2_TIME_COST=settings.ARGON2_TIME_COST + 1):
+            # a hash made w/ the previous costs is valid, and outdated
+            self.assertEqual(verify_password('password1234', self.test_user.password), (True, True))
+            self.assertEqual(rehash_password(self.test_user.id, 'password1234', self.test_user.password), 1)
+            self.test_user.refresh_from_db()
+            self.assertEqual(verify_password('password1234', self.test_user.password), (True, False))
+
+    def test_changed_password_is_not_overwritten(self):
+        outdated = self.test_user.password
+        self.test_user.set_password('password5678')
+        self.test_user.save()
+        self.assertEqual(rehash_password(self.test_user.id, 'password1234', outdated), 0)
+        self.test_user.refresh_from_db()
+        self.assertTrue(self.test_user.check_password('password5678'))
+
+
+class LastLoginTest(APITestCase):
+
+    def setUp(self):
+        self.valid_login_request = {
+            'email': 'test@example.com',
+            'password': 'password1234',
+        }
+        self.test_user = User.objects.create_user(**self.valid_login_request)
+
+    def test_last_login_is_written_by_flush(self):
+        response = self.client \
+            .post('/token/login/', self.valid_login_request, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.test_user.refresh_from_db()
+        self.assertIsNone(self.test_user.last_login)
+        # every pending login is written in one statement
+        with self.assertNumQueries(1):
+            buffer.flush()
+        self.test_user.refresh_from_db()
+        self.assertIsNotNone(self.test_user.last_login)
+
+    @override_settings(LAST_LOGIN_MAX_STALENESS=0)
+    def test_last_login_is_written_immediately(self):
+        response = self.client \
+            .post('/token/login/', self.valid_login_request, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.test_user.refresh_from_db()
+        self.assertIsNotNone(self.test_user.last_login)
+
+
+class EmailLookupTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # seed a million users, so the planner prefers an index over a sequential scan
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO users_user
+                    (password, id, email, verified, profile, status, is_staff, join_date, updated_at)
+                SELECT '', md5(i::text)::uuid, 'user' || i || '@example.com', false, '{}',
+                    'active', false, now(), now()
+                FROM generate_series(1, 1000000) AS i
+            """)
+            cursor.execute('ANALYZE users_user')
+
+    def test_lookup_ignores_case(self):
+        user = User.objects.with_email('User500000@Example.COM').get()
+        self.assertEqual(user.email, 'user500000@example.com')
+
+    def test_lookup_uses_index(self):
+        plan = User.objects.with_email('User500000@Example.COM').explain()
+        self.assertIn('Index Scan', plan)
+        self.assertNotIn('Seq Scan', plan)
+        # the exists() query used to validate email changes, excluding the current user,
+        # which reads a single row (LIMIT 1)
+        seeded_id = uuid.UUID(hashlib.md5(b'1').hexdigest())
+        plan = User.objects.with_email('User500000@Example.COM').exclude(id=seeded_id) \
+            .values('id')[:1].explain()
+        self.assertIn('Index Scan', plan)
+        self.assertNotIn('Seq Scan', plan)
+
+
+class ProfileValidationTest(APITestCase):
+
+    @override_settings(PROFILE_JSON_SCHEMA=REQUIRED_NAME_SCHEMA)
+    def test_createsuperuser_reports_invalid_profile(self):
+        # the superuser has an empty profile, which the schema rejects
+        with mock.patch.dict(os.environ, {'DJANGO_SUPERUSER_PASSWORD': 'password1234'}), \
+                self.assertRaisesMessage(CommandError, "'name' is a required property"):
+            call_command('createsuperuser', email='admin@example.com', interactive=False)
+        self.assertFalse(User.objects.exists())
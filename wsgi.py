@@ -1,2 +1,8 @@
 from configurations.wsgi import get_wsgi_application
-application = get_wsgi_application()
\ No newline at end of file
+from django.conf import settings
+application = get_wsgi_application()
+
+# answer /status/ and /token/inspect/ w/o the full django and DRF stack
+if settings.FAST_PATH:
+    from core.fast import FastPathWSGI
+    application = FastPathWSGI(application)